@@ -1,31 +1,74 @@
 import _thread
-import time
+import micropython_time as time
 
 from .LoRaDataLink import LoRaDataLink
 from .LoRaTCP import LoRaTCP
 from Singleton import Singleton
+from micropython import const
+
+# Obergrenze für den Backoff im Leerlauf: 1 << 8 -> 256 ms, damit LoRaTCP.run()
+# weiterhin deutlich häufiger als alle 1000 ms aufgerufen wird
+_MAX_IDLE_EXPONENT = const(8)
+
+# Maximale Wartezeit in stop(), bis alle Verbindungen abgebaut sind
+STOP_TIMEOUT_MS = const(10_000)
+# Maximale Wartezeit in stop(), bis der Worker seinen letzten Durchlauf beendet hat. Deckt einen
+# Backoff, ein BUSY-Recovery (bis 3 s) und ein Senden mit CAD und langer Time-on-Air ab, nicht aber
+# die Duty-Cycle-Pause eines Sensors (bis zu einer Stunde)
+WORKER_STOP_TIMEOUT_MS = const(10_000)
 
 class LoRaNetworking(Singleton):
     def _init_once(self, *args, **kwargs):
         self.data_link = LoRaDataLink()
-        self.networking_thread = _thread.start_new_thread(self._networking_worker, (self,))
+        # running muss vor dem Start gesetzt sein, sonst kann der Thread die Schleife sofort verlassen
         self.running = True
+        self.worker_stopped = False
+        self.networking_thread = _thread.start_new_thread(self._networking_worker, (self,))
 
 
     def _networking_worker(self, _):
         print("[LoRaNetworking] Networking thread started")
+        # Lokale Aliase, damit die Attribute nicht in jedem Durchlauf nachgeschlagen werden.
+        # LoRaTCP.RUN_METHODS wird nur verändert, nie neu zugewiesen, der Alias bleibt also gültig.
+        run_methods = LoRaTCP.RUN_METHODS
+        data_link_run = self.data_link.run
+        sleep_ms = time.sleep_ms
+        idle = 0
         while self.running:
-            for tcp in LoRaTCP.INSTANCES: # type: LoRaTCP
-                tcp.run()
-            self.data_link.run()
+            did_work = False
+            for tcp_run in run_methods:
+                if tcp_run():
+                    did_work = True
+            if data_link_run():
+                did_work = True
+            if did_work:
+                idle = 0
+            else:
+                # Exponentieller Backoff, solange weder TCP noch DataLink etwas zu tun hatten
+                if idle < _MAX_IDLE_EXPONENT:
+                    idle += 1
+                sleep_ms(1 << idle)
+        self.worker_stopped = True
         print("[LoRaNetworking] Networking thread stopped")
 
     def stop(self):
         print("[LoRaNetworking] Gracefully stopping networking thread")
-        for tcp in LoRaTCP.INSTANCES:  # type: LoRaTCP
+        # Über eine Kopie iterieren, da close() Sockets sofort aus INSTANCES entfernen kann
+        for tcp in list(LoRaTCP.INSTANCES):  # type: LoRaTCP
             tcp.close()
-        time.sleep(10)
+        # Geschlossene Sockets entfernen sich selbst aus LoRaTCP.INSTANCES. Warten bis die
+        # Liste leer ist, höchstens aber STOP_TIMEOUT_MS
+        deadline = time.ticks_add(time.ticks_ms(), STOP_TIMEOUT_MS)
+        while LoRaTCP.INSTANCES and time.ticks_diff(deadline, time.ticks_ms()) > 0:
+            time.sleep_ms(50)
         self.running = False
+        # Warten bis der Worker seinen letzten Durchlauf beendet hat, höchstens WORKER_STOP_TIMEOUT_MS.
+        # Läuft er danach noch (z.B. Duty-Cycle-Pause), kehrt stop() mit einer Warnung zurück
+        deadline = time.ticks_add(time.ticks_ms(), WORKER_STOP_TIMEOUT_MS)
+        while not self.worker_stopped and time.ticks_diff(deadline, time.ticks_ms()) > 0:
+            time.sleep_ms(10)
+        if not self.worker_stopped:
+            print(f"[LoRaNetworking] Networking thread still running after {WORKER_STOP_TIMEOUT_MS} ms")
 
     def is_sleep_ready(self) -> bool:
         return self.data_link.is_sleep_ready()
@@ -1,6 +1,5 @@
 import _thread
 
-import gc
 import  asyncio
 from collections import deque
 
@@ -21,8 +20,9 @@ class Queue:
         """Schneller sync Zugriff"""
         with self.thread_lock:
             if len(self.queue) >= self.maxsize:
+                # Ältestes Element verwerfen statt zu blockieren. Kein gc.collect() an dieser
+                # Stelle, sonst läuft unter Last bei jedem put eine komplette Garbage Collection
                 self.queue.popleft()
-                gc.collect()
                 print("[Queue] Warning maximum size reached. Removed oldest item")
             self.queue.append(item)
 
@@ -30,8 +30,8 @@ class Queue:
         """Schneller async Zugriff"""
         with self.thread_lock:
             if len(self.queue) >= self.maxsize:
+                # Wie in put_sync(): ältestes Element verwerfen, ohne gc.collect()
                 self.queue.popleft()
-                gc.collect()
                 print("[Queue] Warning maximum size reached. Removed oldest item")
             self.queue.append(item)
 
@@ -20,10 +20,11 @@ LORA_DATALINK_MODE = LORA_DATALINK_MODE_SENSOR
 DATAFRAME_HEADER_LENGTH = 7
 DATAFRAME_MAX_PAYLOAD_LENGTH = 249
 
-DATAFRAME_TYPE = {
-    0x00: "LoRaDataLink_Woke_Up",
-    0x01: "LoRaTCP_Segment"
-}
+# Namen der DataFrame Typen, der Typ-Wert ist der Index (statt Dict: kein Hashing)
+DATAFRAME_TYPE = (
+    "LoRaDataLink_Woke_Up",  # 0x00
+    "LoRaTCP_Segment"  # 0x01
+)
 
 LoRaDataLink_Woke_Up = 0x00
 LoRaTCP_Segment = 0x01
@@ -42,13 +43,15 @@ def _log(message: str, loglevel=LOGLEVEL_DEBUG):
 
 class SensorState:
     __slots__ = ('sensor_address', 'socket_ids', 'last_communication')
-    INSTANCES = list()
+    # Statt einer Liste mit linearer Suche: Zustände nach Adresse und nach Socket-ID
+    _by_address = dict()  # type: Dict[bytes, SensorState]
+    _by_socket_id = dict()  # type: Dict[int, SensorState]
 
     def __init__(self, sensor_address: bytes):
         self.sensor_address = sensor_address
-        self.socket_ids = list()
+        self.socket_ids = set()
         self.last_communication = None
-        SensorState.INSTANCES.append(self)
+        SensorState._by_address[sensor_address] = self
 
     def is_active(self) -> bool:
         if self.last_communication is None:
@@ -56,21 +59,20 @@ class SensorState:
         else:
             return (time.time() * 1000 - self.last_communication) <= SENSOR_ACTIVE_TIMEOUT
 
+    def add_socket_id(self, socket_id: int):
+        """
+        Ordnet eine Socket-ID diesem Sensor zu. Die letzte Zuordnung einer Socket-ID gewinnt.
+        """
+        self.socket_ids.add(socket_id)
+        SensorState._by_socket_id[socket_id] = self
+
     @staticmethod
     def get_state_by_address(sensor_address: bytes) -> "SensorState":
-        state = None
-        for instance in SensorState.INSTANCES:
-            if instance.sensor_address == sensor_address:
-                state = instance
-        return state
+        return SensorState._by_address.get(sensor_address)
 
     @staticmethod
-    def get_by_socket_id(socket_id: bytes) -> "SensorState":
-        state = None
-        for instance in SensorState.INSTANCES:
-            if socket_id in instance.socket_ids:
-                state = instance
-        return state
+    def get_by_socket_id(socket_id: int) -> "SensorState":
+        return SensorState._by_socket_id.get(socket_id)
 
 class LoRaDataFrame:
     __slots__ = ("address", "data_type", "payload")
@@ -81,7 +83,7 @@ class LoRaDataFrame:
     def __init__(self, address: bytes, data_type: int, payload: bytes):
         if len(address) != 6:
             raise ValueError("address must be 6 bytes")
-        if data_type not in DATAFRAME_TYPE:
+        if not 0 <= data_type <= LoRaTCP_Segment:
             raise ValueError("invalid data_type")
         if len(payload) > (DATAFRAME_MAX_PAYLOAD_LENGTH):
             raise ValueError("payload too large for frame")
@@ -97,14 +99,14 @@ class LoRaDataFrame:
     def from_bytes(cls, data: bytes) -> "LoRaDataFrame":
         if len(data) < cls._HEADER_SIZE:
             raise ValueError("Frame too short")
-        address, data_type_value = struct.unpack(cls._STRUCT_FORMAT, data[:cls._HEADER_SIZE])
-        if data_type_value not in DATAFRAME_TYPE:
+        address, data_type_value = struct.unpack_from(cls._STRUCT_FORMAT, data, 0)
+        if data_type_value > LoRaTCP_Segment:
             raise ValueError(f"Unknown data type: {data_type_value}")
         payload = data[cls._HEADER_SIZE:]
         return cls(address, data_type_value, payload)
 
     def __repr__(self):
-        type_name = DATAFRAME_TYPE.get(self.data_type, "Unknown")
+        type_name = DATAFRAME_TYPE[self.data_type] if self.data_type <= LoRaTCP_Segment else "Unknown"
         return f"<LoRaDataFrame address={self.address.hex()} type={type_name} payload_len={len(self.payload)}>"
 
 def get_socket_id_from_frame(segment_bytes: bytes) -> int:
@@ -124,6 +126,7 @@ class TCPDataLink:
 
         self.sockets = list()
         self.listening_sockets = list()
+        self._sockets_by_id = dict()
         self._receiveQueue = Queue(maxsize=10)
         self._transmitQueue = Queue(maxsize=10)
         self._duty_cycle_timer = time.time() * 1000
@@ -287,10 +290,7 @@ class TCPDataLink:
             if self.mode == LORA_DATALINK_MODE_GATEWAY or self.sensor_address == lora_dataframe.address:
                 if lora_dataframe.data_type == LoRaTCP_Segment:
                     socket_id = get_socket_id_from_frame(lora_dataframe.payload)
-                    socket = None
-                    for sock in self.sockets:
-                        if sock.tcb.socket_id == socket_id:
-                            socket = sock
+                    socket = self._sockets_by_id.get(socket_id)
 
                     if socket is None and len(self.listening_sockets) > 0:
                         socket = self.listening_sockets[0]
@@ -302,8 +302,7 @@ class TCPDataLink:
                         state = SensorState.get_state_by_address(lora_dataframe.address)
                         if state is None:
                             state = SensorState(lora_dataframe.address)
-                        if socket_id not in state.socket_ids:
-                            state.socket_ids.append(socket_id)
+                        state.add_socket_id(socket_id)
                         _log(f"Updated last communication time for sensor {state.sensor_address}")
                         state.last_communication = time.time() * 1000
 
@@ -332,21 +331,24 @@ class TCPDataLink:
             state = SensorState(socket.tcb.socket_id)
             state.last_communication = time.time() * 1000
         self.sockets.append(socket)
+        self._sockets_by_id[socket.tcb.socket_id] = socket
 
-    def run(self):
+    def run(self) -> bool:
         if self._transmission_block:
-            return
+            return False
         
         # Run all registered LoRaTCP sockets to process incoming segments
+        did_work = False
         for socket in self.sockets + self.listening_sockets:
-            socket.run()
+            if socket.run():
+                did_work = True
         
         remaining_cycle_time = self._get_remaining_duty_cycle_time_reset_timer_if_necessary()
         if self.mode == LORA_DATALINK_MODE_GATEWAY and self._transmit_time > self.duty_cycle_budget_ms:
             if not self._duty_cycle_message_displayed:
                 _log(f'Reached duty cycle budget of {self.duty_cycle_budget_ms/1000} seconds per hour. Stop sending messages for the next {remaining_cycle_time} ms...', LOGLEVEL_INFO)
                 self._duty_cycle_message_displayed = True
-            return
+            return did_work
         elif self._transmit_time > self.duty_cycle_budget_ms:
             _log(f'Reached duty cycle budget of {self.duty_cycle_budget_ms/1000} seconds per hour. Sleeping for {remaining_cycle_time} ms...', LOGLEVEL_INFO)
             time.sleep(remaining_cycle_time / 1000)
@@ -363,6 +365,8 @@ class TCPDataLink:
             except Exception as e:
                 _log(f"{e}", LOGLEVEL_ERROR)
                 self._transmitQueue.put_sync_left(lora_dataframe)
+            return True
+        return did_work
 
     def _get_remaining_duty_cycle_time_reset_timer_if_necessary(self) -> int:
         current_time = time.time() * 1000
@@ -440,6 +444,11 @@ class TCPDataLink:
     def remove_socket(self, socket: "LoRaTCP"):
         if socket in self.sockets:
             self.sockets.remove(socket)
+        # tcb.socket_id wurde von TCB.delete() bereits zurückgesetzt, daher über den Socket suchen
+        for socket_id, sock in self._sockets_by_id.items():
+            if sock is socket:
+                del self._sockets_by_id[socket_id]
+                break
 
     def prepare_for_sleep(self):
         self._transmission_block = True
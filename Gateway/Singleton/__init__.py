@@ -1,3 +1,8 @@
+def _skip_init(self, *args, **kwargs):
+    # Ersetzt __init__ einer Klasse, nachdem deren Instanz initialisiert wurde
+    pass
+
+
 class Singleton:
     """
     - Jede Klasse hat ihre eigene Instanz
@@ -5,28 +10,28 @@ class Singleton:
     - Thread-safe
     """
 
-    _instances = {}  # Dictionary für Instanzen pro Klasse
-    _initialized = {}  # Dictionary für Initialisierung-Status pro Klasse
+    _instances = {}  # Dictionary für Instanzen pro Klasse (Schlüssel ist die Klasse selbst)
 
     def __new__(cls, *args, **kwargs):
-        # Verwende den Klassennamen als Schlüssel
-        class_name = cls.__name__
-
-        if class_name not in cls._instances:
+        # Die Klasse selbst ist der Schlüssel: kein Nachschlagen von __name__ und
+        # keine Kollision zwischen gleichnamigen Klassen aus verschiedenen Modulen
+        instance = cls._instances.get(cls)
+        if instance is None:
             # Erstelle neue Instanz
             instance = super(Singleton, cls).__new__(cls)
-            cls._instances[class_name] = instance
-            cls._initialized[class_name] = False
-
-        return cls._instances[class_name]
+            cls._instances[cls] = instance
+            # Eine Unterklasse einer bereits initialisierten Singleton-Klasse erbt deren
+            # _skip_init und muss selbst noch einmal initialisiert werden
+            if cls.__init__ is _skip_init:
+                cls.__init__ = Singleton.__init__
+        return instance
 
     def __init__(self, *args, **kwargs):
-        class_name = self.__class__.__name__
-
-        # Nur initialisieren wenn noch nicht geschehen
-        if not self._initialized.get(class_name, False):
-            self._init_once(*args, **kwargs)
-            self._initialized[class_name] = True
+        self._init_once(*args, **kwargs)
+        # Nach der ersten Initialisierung wird __init__ der Klasse ersetzt. Weitere Aufrufe
+        # von Klasse() geben nur noch die Instanz aus __new__ zurück, ohne Prüfung pro Aufruf.
+        # (Bewusst ohne Metaklasse, da MicroPython diese nur eingeschränkt unterstützt)
+        type(self).__init__ = _skip_init
 
     def _init_once(self, *args, **kwargs):
         """
@@ -40,8 +45,7 @@ class Singleton:
         """
         Alternative Methode um die Instanz zu bekommen ohne neue Parameter
         """
-        class_name = cls.__name__
-        if class_name in cls._instances:
-            return cls._instances[class_name]
-        else:
-            return cls()  # Erstelle neue Instanz mit Standard-Parametern
\ No newline at end of file
+        instance = cls._instances.get(cls)
+        if instance is not None:
+            return instance
+        return cls()  # Erstelle neue Instanz mit Standard-Parametern
\ No newline at end of file
@@ -2,4 +2,7 @@ def schedule(callback, arg):
     return callback(arg)
 
 def const(value):
-    return value
\ No newline at end of file
+    return value
+
+def native(func):
+    return func
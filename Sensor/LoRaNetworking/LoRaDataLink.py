@@ -1,3 +1,4 @@
+import _thread
 import gc
 import struct
 
@@ -5,7 +6,7 @@ from micropython import const
 import machine
 import time
 from config.lora_config import configure_modem, diagnose_lora
-from LoRaNetworking.Queue import Queue
+from ucollections import deque
 from Singleton import Singleton
 from lora import RxPacket, SX1262
 
@@ -15,6 +16,9 @@ LOGLEVEL_INFO = const(1)
 LOGLEVEL_WARNING = const(2)
 LOGLEVEL_ERROR = const(3)
 DATALINK_LOG_LEVEL = const(LOGLEVEL_INFO)
+# Vorab ausgewertet: Nachrichten werden nur formatiert, wenn sie auch ausgegeben werden
+_DBG = DATALINK_LOG_LEVEL == LOGLEVEL_DEBUG
+_INFO = DATALINK_LOG_LEVEL <= LOGLEVEL_INFO
 
 # Betriebsmodus der DataLink Layer
 LORA_DATALINK_MODE_SENSOR = const(0)
@@ -22,7 +26,18 @@ LORA_DATALINK_MODE_GATEWAY = const(1)
 LORA_DATALINK_MODE = LORA_DATALINK_MODE_SENSOR
 
 CAD_TIMEOUT = const(200)
+# Ausführliche Diagnose des Modems beim Start (zusätzliche SPI-Zugriffe), im Betrieb aus
+ENABLE_LORA_DIAGNOSTICS = const(0)
+# Spätestens nach dieser Zeit wird das Modem auch ohne Interrupt abgefragt (verlorene Interrupts)
+RX_POLL_WITH_IRQ_MS = const(1000)
+# Mindestabstand zwischen einem empfangenen Frame und dem nächsten eigenen Senden,
+# damit die Gegenstelle nach ihrem Senden wieder empfangsbereit ist
+RX_TX_TURNAROUND_MS = const(100)
 DUTY_CYCLE_PERCENT = const(10) # 434 MHz 10%; 868 MHz 1%
+DUTY_CYCLE_PERIOD_MS = const(3_600_000) # 60 * 60 * 1000: Eine Stunde in Millisekunden
+# Erlaubte Sendezeit pro Periode. Derzeit 3_600_000 ms, also 100 % der Stunde: die Begrenzung
+# ist damit faktisch abgeschaltet und nicht aus DUTY_CYCLE_PERCENT abgeleitet
+DUTY_CYCLE_BUDGET_MS = const(3_600_000)
 
 # Konstanten für Längen
 # 6 Bytes für Sensor-Adresse und 1 Byte für DataFrameType
@@ -31,16 +46,28 @@ DATAFRAME_HEADER_LENGTH = const(7)
 DATAFRAME_MAX_PAYLOAD_LENGTH = const(249)
 
 # DataFrame Typen
-DATAFRAME_TYPE = {
-    0x00: "LoRaDataLink_Woke_Up",
-    0x01: "LoRaTCP_Segment"
-}
+# Namen der DataFrame Typen, der Typ-Wert ist der Index (statt Dict: kein Hashing)
+DATAFRAME_TYPE = (
+    "LoRaDataLink_Woke_Up",  # 0x00
+    "LoRaTCP_Segment"  # 0x01
+)
 
 LoRaDataLink_Woke_Up = const(0x00)
 LoRaTCP_Segment = const(0x01)
 
+# Maximale Anzahl wartender Dataframes pro Sende-Warteschlange
+TRANSMIT_QUEUE_SIZE = const(10)
+
+# Belegter Heap in Byte, ab dem nach dem Senden bzw. nach einem Recovery aufgeräumt wird
+GC_ALLOC_THRESHOLD = const(64_000)
+# Nur MicroPython kennt gc.mem_alloc(). Unter CPython (Gateway) gibt der Referenzzähler
+# Objekte sofort frei, dort wird keine zusätzliche Collection angestoßen
+_HAS_MEM_ALLOC = hasattr(gc, "mem_alloc")
+
 # Timeout in Millisekunden nach dem ein Sensor als inaktiv betrachtet wird
 SENSOR_ACTIVE_TIMEOUT = 10_000
+# Nach dieser Zeit ohne Kommunikation wird der Zustand eines Sensors verworfen
+SENSOR_STATE_MAX_AGE_MS = const(3_600_000)
 
 
 def _log(message: str, loglevel=LOGLEVEL_DEBUG):
@@ -56,35 +83,70 @@ def _log(message: str, loglevel=LOGLEVEL_DEBUG):
 
 class SensorState:
     __slots__ = ('sensor_address', 'socket_ids', 'last_communication')
-    INSTANCES = list()
+    # Statt einer Liste mit linearer Suche: Zustände nach Adresse und nach Socket-ID
+    _by_address = dict()  # type: Dict[bytes, SensorState]
+    _by_socket_id = dict()  # type: Dict[int, SensorState]
 
     def __init__(self, sensor_address: bytes):
         self.sensor_address = sensor_address  # type: bytes
-        self.socket_ids = list()  # type: List[int]
-        self.last_communication = None  # type: int
-        SensorState.INSTANCES.append(self)
+        self.socket_ids = set()  # type: Set[int]
+        # Zeitpunkt knapp außerhalb des Timeouts statt None: ein neuer Sensor ist inaktiv,
+        # ohne dass is_active() einen Sonderfall prüfen muss
+        self.last_communication = time.ticks_add(time.ticks_ms(), -(SENSOR_ACTIVE_TIMEOUT + 1))  # type: int
+        SensorState._by_address[sensor_address] = self
 
-    def is_active(self) -> bool:
-        if self.last_communication is None:
-            return False
-        else:
-            return time.ticks_diff(time.ticks_ms(), self.last_communication) <= SENSOR_ACTIVE_TIMEOUT
+    def is_active(self, now: int = None) -> bool:
+        """
+        Args:
+            now: Aktueller Zeitstempel (time.ticks_ms()), falls der Aufrufer ihn bereits hat
+        """
+        return time.ticks_diff(time.ticks_ms() if now is None else now,
+                               self.last_communication) <= SENSOR_ACTIVE_TIMEOUT
+
+    def add_socket_id(self, socket_id: int):
+        """
+        Ordnet eine Socket-ID diesem Sensor zu. Die letzte Zuordnung einer Socket-ID gewinnt.
+        """
+        self.socket_ids.add(socket_id)
+        SensorState._by_socket_id[socket_id] = self
 
     @staticmethod
     def get_state_by_address(sensor_address: bytes) -> "SensorState":
-        state = None
-        for instance in SensorState.INSTANCES:  # type: SensorState
-            if instance.sensor_address == sensor_address:
-                state = instance
-        return state
+        return SensorState._by_address.get(sensor_address)
 
     @staticmethod
-    def get_by_socket_id(socket_id: bytes) -> "SensorState":
-        state = None
-        for instance in SensorState.INSTANCES:
-            if socket_id in instance.socket_ids:
-                state = instance
-        return state
+    def get_by_socket_id(socket_id: int) -> "SensorState":
+        return SensorState._by_socket_id.get(socket_id)
+
+    @staticmethod
+    def evict_stale(now: int, open_socket_ids, max_age_ms: int = SENSOR_STATE_MAX_AGE_MS) -> list:
+        """
+        Verwirft Zustände von Sensoren, die länger als max_age_ms nicht kommuniziert haben,
+        damit die Tabellen auf einem lang laufenden Gateway nicht unbegrenzt wachsen.
+        Zustände mit einem noch registrierten Socket bleiben erhalten.
+
+        Args:
+            now: Aktueller Zeitstempel (time.ticks_ms())
+            open_socket_ids: Socket-IDs der registrierten Sockets (unterstützt `in`)
+            max_age_ms: Maximales Alter der letzten Kommunikation
+        Returns:
+            list: Adressen der verworfenen Sensoren
+        """
+        by_address = SensorState._by_address
+        by_socket_id = SensorState._by_socket_id
+        evicted = []
+        for sensor_address, state in list(by_address.items()):
+            if time.ticks_diff(now, state.last_communication) <= max_age_ms:
+                continue
+            if any(socket_id in open_socket_ids for socket_id in state.socket_ids):
+                continue
+            del by_address[sensor_address]
+            for socket_id in state.socket_ids:
+                # Eine Socket-ID kann inzwischen einem anderen Sensor zugeordnet sein
+                if by_socket_id.get(socket_id) is state:
+                    del by_socket_id[socket_id]
+            evicted.append(sensor_address)
+        return evicted
 
 
 class LoRaDataFrame:
@@ -104,7 +166,7 @@ class LoRaDataFrame:
     def __init__(self, address: bytes, data_type: int, payload: bytes):
         if len(address) != 6:
             raise ValueError("address must be 6 bytes")
-        if data_type not in DATAFRAME_TYPE:
+        if not 0 <= data_type <= LoRaTCP_Segment:
             raise ValueError("invalid data_type")
         if len(payload) > (DATAFRAME_MAX_PAYLOAD_LENGTH):
             raise ValueError("payload too large for frame")
@@ -112,30 +174,85 @@ class LoRaDataFrame:
         self.data_type = data_type
         self.payload = payload
 
-    def to_bytes(self) -> bytes:
+    def to_bytes(self) -> bytearray:
         """
         Serialisiert den Frame für die Übertragung via LoRa.
+        Header und Payload werden direkt in einen Puffer passender Größe geschrieben,
+        ohne Zwischenobjekt für den Header und ohne Verkettung.
         """
-        header = struct.pack(self._STRUCT_FORMAT, self.address, self.data_type)
-        return header + self.payload
+        buffer = bytearray(self._HEADER_SIZE + len(self.payload))
+        self.pack_into(buffer)
+        return buffer
+
+    def pack_into(self, buffer) -> int:
+        """
+        Schreibt den Frame an den Anfang von buffer (mind. 256 Byte) und gibt die Frame-Länge zurück.
+        Vermeidet die Allokation von Header und zusammengesetztem Frame bei jedem Senden.
+        """
+        struct.pack_into(self._STRUCT_FORMAT, buffer, 0, self.address, self.data_type)
+        end = self._HEADER_SIZE + len(self.payload)
+        buffer[self._HEADER_SIZE:end] = self.payload
+        return end
 
     @classmethod
     def from_bytes(cls, data: bytes) -> "LoRaDataFrame":
         """
         Deserialisiert empfangene Bytes in ein LoRaDataFrame-Objekt.
+        Der Header wird ohne Slicing gelesen. Adresse (Schlüssel für SensorState) und
+        Payload werden bewusst als eigene Objekte angelegt, siehe Kommentar unten.
+
+        Die Prüfungen aus __init__ werden übersprungen: Die Adresse hat durch das
+        Struct-Format immer 6 Byte und ein empfangener Frame ist höchstens 255 Byte lang.
         """
         if len(data) < cls._HEADER_SIZE:
             raise ValueError("Frame too short")
-        address, data_type_value = struct.unpack(cls._STRUCT_FORMAT, data[:cls._HEADER_SIZE])
-        if data_type_value not in DATAFRAME_TYPE:
+        address, data_type_value = struct.unpack_from(cls._STRUCT_FORMAT, data, 0)
+        # Es gibt nur die Typen 0x00 und 0x01, ein Vergleich ist günstiger als der Dict-Lookup
+        if data_type_value > LoRaTCP_Segment:
             raise ValueError(f"Unknown data type: {data_type_value}")
-        payload = data[cls._HEADER_SIZE:]
-        return cls(address, data_type_value, payload)
+        frame = object.__new__(cls)
+        frame.address = address
+        frame.data_type = data_type_value
+        # Kopie ist nötig: der Empfangspuffer des Treibers (RxPacket) wird wiederverwendet,
+        # das Segment wird aber erst später in LoRaTCP.run() ausgewertet
+        frame.payload = data[cls._HEADER_SIZE:]
+        return frame
 
     def __repr__(self):
-        type_name = DATAFRAME_TYPE.get(self.data_type, "Unknown")
+        type_name = DATAFRAME_TYPE[self.data_type] if self.data_type <= LoRaTCP_Segment else "Unknown"
         return f"<LoRaDataFrame address={self.address.hex()} type={type_name} payload_len={len(self.payload)}>"
 
+def _append_dropping_oldest(queue: deque, lora_dataframe: "LoRaDataFrame") -> bool:
+    """
+    Hängt einen Dataframe an eine Sende-Warteschlange an. Ist sie voll, wird wie bisher in
+    Queue.put_sync() der älteste Dataframe verworfen, statt zu blockieren.
+
+    Returns:
+        bool: True wenn dafür ein älterer Dataframe verworfen wurde
+    """
+    dropped = len(queue) >= TRANSMIT_QUEUE_SIZE
+    if dropped:
+        queue.popleft()
+        _log("Transmit queue full. Dropped oldest dataframe", LOGLEVEL_WARNING)
+    queue.append(lora_dataframe)
+    return dropped
+
+def _collect_if_needed():
+    """
+    Räumt den Heap nur auf, wenn die Belegung GC_ALLOC_THRESHOLD überschreitet,
+    statt bei jedem Frame eine vollständige Collection auszuführen.
+    """
+    if _HAS_MEM_ALLOC and gc.mem_alloc() > GC_ALLOC_THRESHOLD:
+        gc.collect()
+
+
+def _is_busy_timeout(error: Exception) -> bool:
+    """
+    Erkennt den BUSY-Timeout des SX1262-Treibers (RuntimeError("BUSY timeout", timeout_us))
+    über das erste Argument, ohne die Exception in einen String umzuwandeln.
+    """
+    return isinstance(error, RuntimeError) and len(error.args) > 0 and error.args[0] == "BUSY timeout"
+
 def get_socket_id_from_frame(segment_bytes: bytes) -> int:
     socket_id_flag_byte = segment_bytes[0]
     socket_id = (socket_id_flag_byte & 0xF0) >> 4
@@ -148,39 +265,82 @@ class LoRaDataLink(Singleton):
     Sie implementiert eine asynchrone Sender- und Empfänger-Logik für LoRa,
     wobei der offizielle MicroPython SX1262-Treiber verwendet wird.
 
-    Außerdem verwaltet sie einen Sendepuffer (transmitQueue) und einen Empfangspuffer (receiveQueue).
+    Außerdem verwaltet sie die Sendepuffer (transmitQueue bzw. eine Warteschlange pro Sensor).
+    Empfangene Dataframes werden direkt an die Sockets weitergegeben.
     """
 
-    __slots__ = ('mode', 'sensor_address', '_driver', '_receiveQueue', '_transmitQueue', '_duty_cycle_timer',
+    __slots__ = ('mode', 'sensor_address', '_driver', '_transmitQueue', '_transmit_queues', '_duty_cycle_deadline',
                  '_transmit_time', 'sockets', 'listening_sockets', '_transmission_block',
-                 '_duty_cycle_message_displayed', 'duty_cycle_budget_ms', '_busy_timeout_retries', '_will_irq', '_rx_packet', 'send_counter','receive_counter')
+                 '_duty_cycle_message_displayed', 'duty_cycle_budget_ms', '_busy_timeout_retries', '_will_irq', '_rx_packet', 'send_counter','receive_counter',
+                 '_tx_buffer', '_tx_view', '_sockets_by_id', '_rx_irq', '_last_rx_poll', '_wake_up_frame', '_last_rx',
+                 '_tx_cursor', '_tx_pending', '_tx_lock')
 
     def _init_once(self, **kwargs):
         self.mode = LORA_DATALINK_MODE
         if self.mode == LORA_DATALINK_MODE_SENSOR:
             self.sensor_address = machine.unique_id()[:6]  # Eindeutige Geräteadresse
+            # Das Wake-up Paket hängt nur von der festen Adresse ab und wird daher einmal serialisiert
+            self._wake_up_frame = LoRaDataFrame(self.sensor_address, LoRaDataLink_Woke_Up, b'').to_bytes()
         else:
             self.sensor_address = None
+            self._wake_up_frame = None
 
         self._driver = configure_modem()
-        if DATALINK_LOG_LEVEL == LOGLEVEL_DEBUG:
+        if ENABLE_LORA_DIAGNOSTICS:
             diagnose_lora(self._driver)
         self.sockets = list()  # type: List[LoRaTCP]
         self.listening_sockets = list()  # type: List[LoRaTCP]
-        self._receiveQueue = Queue(maxsize=10)
-        self._transmitQueue = Queue(maxsize=10)
-        self._duty_cycle_timer = time.ticks_ms()  # Wird jede Stunde auf die aktuelle Zeit gesetzt
+        self._sockets_by_id = dict()  # type: Dict[int, LoRaTCP]
+        # Einfache deques statt Queue: Einzeloperationen wie append/popleft sind ohne Lock sicher,
+        # entnommen wird nur im Networking-Thread
+        self._transmitQueue = deque((), TRANSMIT_QUEUE_SIZE)  # Nur im Sensor-Modus
+        # Nur im Gateway-Modus: eine Warteschlange pro Sensor-Adresse
+        self._transmit_queues = dict()  # type: Dict[bytes, deque]
+        # Round-Robin: Position, ab der die nächste Suche nach einem sendbaren Sensor beginnt
+        self._tx_cursor = 0
+        # Anzahl wartender Dataframes in _transmit_queues. Ist sie 0, wird im Leerlauf nichts durchsucht.
+        # Änderungen nur unter _tx_lock, weil Anwendungs-Threads über add_to_send_queue() einreihen
+        self._tx_pending = 0
+        self._tx_lock = _thread.allocate_lock()
+        # Ende der aktuellen Duty Cycle Periode, wird jede Stunde um eine Periode verschoben
+        self._duty_cycle_deadline = time.ticks_add(time.ticks_ms(), DUTY_CYCLE_PERIOD_MS)
         self._transmit_time = 0  # Enthält die kumulierte Sendezeit
         self._duty_cycle_message_displayed = False
-        self.duty_cycle_budget_ms = 3_600_000 # Duty cycle budget in millisekunden
+        self.duty_cycle_budget_ms = DUTY_CYCLE_BUDGET_MS # Duty cycle budget in millisekunden
         self._transmission_block = False  # Einfaches Lock um die Kommunikation zu pausieren
         self._busy_timeout_retries = 0  # Zähler für Busy-Timeout Fehler
-        self._will_irq = self._driver.start_recv(continuous=True, timeout_ms=None) # Starte kontinuierlichen Empfang
+        # Der Interrupt (DIO1) setzt nur ein Flag, das Modem wird dann im nächsten run() abgefragt.
+        # Der erste Durchlauf fragt das Modem in jedem Fall ab
+        self._rx_irq = True
+        self._last_rx_poll = time.ticks_ms()
+        self._last_rx = None  # Zeitpunkt des letzten empfangenen Frames
+        self._driver.set_irq_callback(self._on_radio_irq)
+        self._begin_rx()
         self._rx = True
-        self._rx_packet = None # Spart zusätzliche Speicher-Allokation für zukünftige Dataframes
+        # Zuletzt empfangenes RxPacket. Der Treiber schreibt das nächste Paket hinein, wenn es
+        # gleich lang ist, und spart so die Allokation (siehe _read_packet() im Treiber)
+        self._rx_packet = None
+        # Sendepuffer für einen kompletten LoRa-Frame. Wird bei jedem Senden überschrieben, das ist
+        # sicher, weil _driver.send() synchron ist und erst nach dem Versand zurückkehrt
+        self._tx_buffer = bytearray(256)
+        self._tx_view = memoryview(self._tx_buffer)
         self.send_counter = 0
         self.receive_counter = 0
 
+    def _on_radio_irq(self):
+        """
+        Callback des Treibers für den DIO1-Interrupt. Läuft unter Umständen im Hard-IRQ-Kontext,
+        darf also nichts allokieren und setzt deshalb nur ein Flag.
+        """
+        self._rx_irq = True
+
+    def _begin_rx(self):
+        """
+        Startet den kontinuierlichen Empfang. Einziger Aufrufer von start_recv(), damit Start,
+        Senden und Recovery nach einem BUSY-Timeout das Modem gleich konfigurieren.
+        """
+        self._will_irq = self._driver.start_recv(continuous=True, timeout_ms=None)
+
     def register_listening_socket(self, socket: "LoRaTCP"):
         if self.mode == LORA_DATALINK_MODE_SENSOR:
             raise Exception("You can't register a listening socket on a Sensor!")
@@ -193,198 +353,290 @@ class LoRaDataLink(Singleton):
             state = SensorState(socket.tcb.socket_id)
             state.last_communication = time.ticks_ms()
         self.sockets.append(socket)
+        self._sockets_by_id[socket.tcb.socket_id] = socket
+
+    def run(self) -> bool:
+        """
+        Empfängt und sendet höchstens einen Dataframe.
 
-    def run(self):
+        Returns:
+            bool: True wenn ein Dataframe empfangen oder ein Sendeversuch unternommen wurde
+        """
         if self._transmission_block:
-            return
+            return False
+        # Lokale Aliase sparen die Attribut-Lookups bei jedem Durchlauf
+        driver = self._driver
+        sleep_ms = time.sleep_ms
+        ticks_diff = time.ticks_diff
+        did_work = False
         # Weil wir im Konstruktor start_recv(continous=True) aufrufen, empfängt das Modem noch
-        # auch wenn zwischendurch gesendet wird
-        self._rx = self._driver.poll_recv(rx_packet=self._rx_packet) # Prüfe ob Nachricht set letztem Aufruf empfangen wurde
-        if isinstance(self._rx, RxPacket) and len(self._rx) >= DATAFRAME_HEADER_LENGTH:
-            self._handle_rx_packet(self._rx)
+        # auch wenn zwischendurch gesendet wird.
+        # Mit Interrupt wird das Modem nur abgefragt, wenn DIO1 seit der letzten Abfrage ausgelöst hat
+        # (oder RX_POLL_WITH_IRQ_MS vergangen sind), das spart die SPI-Transaktion in jedem Leerlauf.
+        # now wird für den ganzen Durchlauf verwendet (Empfangszeit, Duty Cycle Periode)
+        now = time.ticks_ms()
+        if not self._will_irq or self._rx_irq or ticks_diff(now, self._last_rx_poll) >= RX_POLL_WITH_IRQ_MS:
+            # Flag vor der Abfrage zurücksetzen, damit ein Interrupt währenddessen nicht verloren geht
+            self._rx_irq = False
+            self._last_rx_poll = now
+            try:
+                self._rx = driver.poll_recv(rx_packet=self._rx_packet) # Prüfe ob Nachricht set letztem Aufruf empfangen wurde
+            except Exception as e:
+                # Ein BUSY-Timeout beim Empfangen wird genauso behandelt wie beim Senden,
+                # statt den Networking-Thread mit der Exception zu beenden
+                _log(f"{e}", LOGLEVEL_ERROR)
+                if _is_busy_timeout(e):
+                    self._handle_busy_error()
+                    return True
+                # Andere Fehler zählen nicht als Arbeit, damit der Idle-Backoff in LoRaNetworking greift
+                return False
+        rx = self._rx
+        if isinstance(rx, RxPacket) and len(rx) >= DATAFRAME_HEADER_LENGTH:
+            self._handle_rx_packet(rx, now)
+            # Wiederverwendung ist sicher: from_bytes() kopiert Adresse und Payload
+            self._rx_packet = rx
             self._rx = True
-            time.sleep_ms(100)
+            did_work = True
+            # Statt hier RX_TX_TURNAROUND_MS zu schlafen, wird erst vor dem nächsten Senden
+            # gewartet. So werden weitere Frames und die TCP-Verarbeitung nicht blockiert
+            self._last_rx = now
         # Holt die verbleibende Zeit der aktuellen Duty Cycle Periode in Millisekunden
         # bzw. setzt die Zeit sowie die Übertragungszeit zurück, wenn eine Stunde vergangen ist
-        remaining_cycle_time = self._get_remaining_duty_cycle_time_reset_timer_if_necessary()
+        remaining_cycle_time = self._get_remaining_duty_cycle_time_reset_timer_if_necessary(now)
         if self.mode == LORA_DATALINK_MODE_GATEWAY and self._transmit_time > self.duty_cycle_budget_ms: # Gateways gehen nicht in den Schlafmodus aber dürfen nicht mehr senden.
             if not self._duty_cycle_message_displayed:
-                _log(f'Reached duty cycle budget of {self.self.duty_cycle_budget_ms/1000} seconds per hour. Stop sending messages for the next {remaining_cycle_time} ms...', LOGLEVEL_INFO)
+                if _INFO:
+                    _log(f'Reached duty cycle budget of {self.duty_cycle_budget_ms/1000} seconds per hour. Stop sending messages for the next {remaining_cycle_time} ms...', LOGLEVEL_INFO)
                 self._duty_cycle_message_displayed = True
-            return  # Überspringe das Senden aber empfange weiterhin
+            return did_work  # Überspringe das Senden aber empfange weiterhin
         # Sensoren gehen in den Schlafmodus
         elif self._transmit_time > self.duty_cycle_budget_ms: # Gerät ist Sensor und hat mehr als das duty cycle budget in der letzten Stunde gesendet
-            _log(f'Reached duty cycle budget of {self.self.duty_cycle_budget_ms/1000} seconds per hour. Sleeping for {remaining_cycle_time} ms...', LOGLEVEL_INFO)
-            try:
-                import App.LightSleepManager
-                LightSleepManager().sleep(remaining_cycle_time, force=True)
-            except Exception:
-                _log("Could not import LightSleepManager. Using time.sleep_ms", LOGLEVEL_WARNING)
-                time.sleep_ms(remaining_cycle_time)
-        lora_dataframe: LoRaDataFrame = self._find_dataframe_for_active_sensor()
+            if _INFO:
+                _log(f'Reached duty cycle budget of {self.duty_cycle_budget_ms/1000} seconds per hour. Sleeping for {remaining_cycle_time} ms...', LOGLEVEL_INFO)
+            # LightSleepManager.sleep() ist eine Coroutine und kann aus dem Networking-Thread nicht
+            # ausgeführt werden, deshalb wird hier direkt geschlafen
+            sleep_ms(remaining_cycle_time)
+        lora_dataframe: LoRaDataFrame = self._find_dataframe_for_active_sensor(now)
         if lora_dataframe is not None:
+            if self._last_rx is not None:
+                wait = RX_TX_TURNAROUND_MS - ticks_diff(time.ticks_ms(), self._last_rx)
+                if wait > 0:
+                    sleep_ms(wait)
             try:
-                self._driver.standby() # Beende kontinuierliches Empfangen
-                result = self._driver.cad(timeout_ms=CAD_TIMEOUT) # Führe Channel Activity Detection durch
+                driver.standby() # Beende kontinuierliches Empfangen
+                result = driver.cad(timeout_ms=CAD_TIMEOUT) # Führe Channel Activity Detection durch
                 if result != 'clear': # Starte sofort den kontinuierlichen Empfang und lese Paket im nächsten Durchlauf aus
-                    self._will_irq = self._driver.start_recv(continuous=True, timeout_ms=None)
-                    _log(f"CAD result not clear: {result}", LOGLEVEL_INFO)
-                    self._transmitQueue.put_sync_left(lora_dataframe)
-                    return
-                _log("CAD result clear. Starting to send...", LOGLEVEL_INFO)
-                start = time.ticks_ms()
-                self._driver.send(lora_dataframe.to_bytes())
+                    self._begin_rx()
+                    if _INFO:
+                        _log(f"CAD result not clear: {result}", LOGLEVEL_INFO)
+                    self._requeue_front(lora_dataframe)
+                    return True
+                if _INFO:
+                    _log("CAD result clear. Starting to send...", LOGLEVEL_INFO)
+                frame_length = lora_dataframe.pack_into(self._tx_buffer)
+                # Keine automatische Garbage Collection während der SPI-Übertragung, eine
+                # GC-Pause mitten im Senden kann zu einem BUSY-Timeout des Modems führen
+                gc.disable()
+                try:
+                    driver.send(self._tx_view[:frame_length])
+                finally:
+                    gc.enable()
                 self.send_counter += 1
-                _log(f"Statistic: send_counter={self.send_counter}, receive_counter={self.receive_counter}",
-                     LOGLEVEL_INFO)
-                time_on_air = time.ticks_diff(time.ticks_ms(), start)
-                self._transmit_time += time_on_air
-                self._will_irq = self._driver.start_recv(continuous=True, timeout_ms=None)
-                _log(f'Sent packet: {lora_dataframe}')
+                if _INFO:
+                    _log(f"Statistic: send_counter={self.send_counter}, receive_counter={self.receive_counter}",
+                         LOGLEVEL_INFO)
+                # Rechnerische Time-on-Air des Modems (Datenblatt-Formel) statt gemessener Zeit,
+                # die Messung enthält auch SPI- und Python-Overhead und belastet das Budget zu stark.
+                # Aufrunden, damit das Duty Cycle Budget nicht unterschätzt wird
+                self._transmit_time += (driver.get_time_on_air_us(frame_length) + 999) // 1000
+                self._begin_rx()
+                if _DBG:
+                    _log(f'Sent packet: {lora_dataframe}')
+                # Unkritischer Zeitpunkt zum Aufräumen: das Modem empfängt bereits wieder selbstständig
+                _collect_if_needed()
             except Exception as e:
                 _log(f"{e}", LOGLEVEL_ERROR)
-                self._transmitQueue.put_sync_left(lora_dataframe)
-                if "BUSY timeout" in str(e):
+                self._requeue_front(lora_dataframe)
+                if _is_busy_timeout(e):
                     self._handle_busy_error()
+            return True
+        return did_work
 
 
-    def _handle_rx_packet(self, rx_packet):
+    def _handle_rx_packet(self, rx_packet, now: int):
+        # Nur Frames akzeptieren, die an dieses Gerät adressiert sind
+        # oder wenn wir die Basisstation sind, werden alle Dataframes akzeptiert.
+        # Die Adresse wird geprüft, bevor ein LoRaDataFrame erzeugt und die Payload kopiert wird
+        if self.mode == LORA_DATALINK_MODE_SENSOR and rx_packet[:6] != self.sensor_address:
+            return
         try:
             lora_dataframe = LoRaDataFrame.from_bytes(rx_packet)
-            _log(f'Received dataframe: {lora_dataframe}')
-            # Nur Frames akzeptieren, die an dieses Gerät adressiert sind
-            # oder wenn wir die Basisstation sind, werden alle Dataframes akzeptiert
-            if self.mode == LORA_DATALINK_MODE_GATEWAY or self.sensor_address == lora_dataframe.address:
-                if lora_dataframe.data_type == LoRaTCP_Segment:
-                    # Weil wir keine Ports benutzen müsen wir die Socket-ID auslesen und
-                    # den Dataframe dem richtigen Socket zuordnen
-                    socket_id = get_socket_id_from_frame(lora_dataframe.payload)
-                    socket = None
-                    for sock in self.sockets:  # type: LoRaTCP
-                        if sock.tcb.socket_id == socket_id:
-                            socket = sock
-
-                    # wenn wir kein Socket mit der Socket-ID haben, schauen wir,
-                    # ob wir ein Socket im LISTEN state haben
-                    if socket is None and len(self.listening_sockets) > 0:
-                        socket = self.listening_sockets[0]  # type: LoRaTCP
-
-                    if socket is None:
-                        raise Exception(
-                            f"Received a LoRaTCP_Segment with socket-id {socket_id}, but we dont have any open "
-                            f"sockets nor listening sockets: {lora_dataframe}")
-
-                    if self.mode == LORA_DATALINK_MODE_GATEWAY:
-                        state = SensorState.get_state_by_address(lora_dataframe.address)
-                        if state is None:
-                            state = SensorState(lora_dataframe.address)
-                        if socket_id not in state.socket_ids:
-                            state.socket_ids.append(socket_id)  # Wird für die Zuordnung beim Senden benötigt
+            if _DBG:
+                _log(f'Received dataframe: {lora_dataframe}')
+            data_type = lora_dataframe.data_type
+            is_gateway = self.mode == LORA_DATALINK_MODE_GATEWAY
+            sockets_by_id = self._sockets_by_id
+            if data_type == LoRaTCP_Segment:
+                # Weil wir keine Ports benutzen müsen wir die Socket-ID auslesen und
+                # den Dataframe dem richtigen Socket zuordnen
+                socket_id = get_socket_id_from_frame(lora_dataframe.payload)
+                socket = sockets_by_id.get(socket_id)  # type: LoRaTCP
+
+                # wenn wir kein Socket mit der Socket-ID haben, schauen wir,
+                # ob wir ein Socket im LISTEN state haben
+                if socket is None and len(self.listening_sockets) > 0:
+                    socket = self.listening_sockets[0]  # type: LoRaTCP
+
+                if socket is None:
+                    raise Exception(
+                        f"Received a LoRaTCP_Segment with socket-id {socket_id}, but we dont have any open "
+                        f"sockets nor listening sockets: {lora_dataframe}")
+
+                if is_gateway:
+                    state = SensorState.get_state_by_address(lora_dataframe.address)
+                    if state is None:
+                        state = SensorState(lora_dataframe.address)
+                    state.add_socket_id(socket_id)  # Wird für die Zuordnung beim Senden benötigt
+                    if _DBG:
                         _log(f"Updated last communication time for sensor {state.sensor_address}")
-                        state.last_communication = time.ticks_ms()
+                    state.last_communication = now
 
-                    socket.add_lora_dataframe_to_queue(lora_dataframe)
-                    self.receive_counter += 1
+                socket.add_lora_dataframe_to_queue(lora_dataframe)
+                self.receive_counter += 1
+                if _INFO:
                     _log(f"Statistic: send_counter={self.send_counter}, receive_counter={self.receive_counter}",
                          LOGLEVEL_INFO)
 
-                elif lora_dataframe.data_type == LoRaDataLink_Woke_Up and self.mode == LORA_DATALINK_MODE_GATEWAY:
-                    state = SensorState.get_state_by_address(lora_dataframe.address)
-                    if state is None:
-                        state = SensorState(lora_dataframe.address)
-                    state.last_communication = time.ticks_ms()
-                    # Timer weiter
-                    for socket_id in state.socket_ids:
-                        socket = None  # type: LoRaTCP
-                        for sock in self.sockets:  # type: LoRaTCP
-                            if sock.tcb.socket_id == socket_id:
-                                socket = sock
-                        if socket is not None:
-                            _log("Sensor became active. Telling TCP socket", LOGLEVEL_INFO)
-                            socket.continue_timer()
-                    self.receive_counter += 1
+            elif data_type == LoRaDataLink_Woke_Up and is_gateway:
+                state = SensorState.get_state_by_address(lora_dataframe.address)
+                if state is None:
+                    state = SensorState(lora_dataframe.address)
+                state.last_communication = now
+                # Timer weiter
+                for socket_id in state.socket_ids:
+                    socket = sockets_by_id.get(socket_id)  # type: LoRaTCP
+                    if socket is not None:
+                        _log("Sensor became active. Telling TCP socket", LOGLEVEL_INFO)
+                        socket.continue_timer()
+                self.receive_counter += 1
+                if _INFO:
                     _log(f"Statistic: send_counter={self.send_counter}, receive_counter={self.receive_counter}",
                          LOGLEVEL_INFO)
 
-
         except ValueError as e:
             _log(f'Received ValueError: {e}', LOGLEVEL_WARNING)
         except Exception as e:
             _log(f'{e}', LOGLEVEL_WARNING)
 
-    def _get_remaining_duty_cycle_time_reset_timer_if_necessary(self) -> int:
+    def _get_remaining_duty_cycle_time_reset_timer_if_necessary(self, current_time: int) -> int:
         # Duty cycle Überprüfung (1% duty cycle = 36 Sekunden/Stunde)
-        current_time = time.ticks_ms()
-        cycle_elapsed = time.ticks_diff(current_time, self._duty_cycle_timer)
-        if cycle_elapsed >= 3_600_000: # 60 * 60 * 1000: Eine Stunde ist vergangen, starte neue Periode
-            self._duty_cycle_timer = current_time
+        remaining_cycle_time = time.ticks_diff(self._duty_cycle_deadline, current_time)
+        if remaining_cycle_time <= 0: # Eine Stunde ist vergangen, starte neue Periode
+            self._duty_cycle_deadline = time.ticks_add(current_time, DUTY_CYCLE_PERIOD_MS)
             self._transmit_time = 0
             self._duty_cycle_message_displayed = False
             self._busy_timeout_retries = 0
             _log("Reset duty cycle timer after 1 hour", LOGLEVEL_INFO)
-        cycle_elapsed = time.ticks_diff(current_time, self._duty_cycle_timer)
-        remaining_cycle_time = 3_600_000 - cycle_elapsed  # (Eine Stunde in Millisekunden) - (der Duty Cycle Periode)
+            self._evict_stale_sensors(current_time)
+            remaining_cycle_time = DUTY_CYCLE_PERIOD_MS
         return remaining_cycle_time
 
-    def _find_dataframe_for_active_sensor(self):
+    def _evict_stale_sensors(self, now: int):
+        """
+        Verwirft veraltete Sensor-Zustände und deren leere Sende-Warteschlangen.
+        Warteschlangen mit wartenden Dataframes bleiben für einen späteren Kontakt erhalten.
+        """
+        for sensor_address in SensorState.evict_stale(now, self._sockets_by_id):
+            queue = self._transmit_queues.get(sensor_address)
+            if queue is not None and len(queue) == 0:
+                del self._transmit_queues[sensor_address]
+        if _DBG:
+            _log(f"Sensor states after eviction: {len(SensorState._by_address)}")
+
+    def _transmit_queue_for(self, sensor_address: bytes) -> deque:
+        """
+        Gibt die Sende-Warteschlange für einen Dataframe zurück. Ein Sensor hat nur eine
+        Warteschlange, das Gateway führt eine eigene Warteschlange pro Sensor-Adresse.
+        """
+        if self.mode == LORA_DATALINK_MODE_SENSOR:
+            return self._transmitQueue
+        queue = self._transmit_queues.get(sensor_address)
+        if queue is None:
+            queue = self._transmit_queues[sensor_address] = deque((), TRANSMIT_QUEUE_SIZE)
+        return queue
+
+    def _find_dataframe_for_active_sensor(self, now: int):
         """
         Durchsucht den Übertragungspuffer nach einem Dataframe für einen aktiven Sensor.
         Gibt das erste gefundene Dataframe zurück und entfernt es aus der Warteschlange.
         Dataframes für inaktive Sensoren bleiben in der Warteschlange für einen späteren Versuch.
-        """
-        if len(self._transmitQueue) == 0:
-            return None
 
+        Auf dem Gateway hat jeder Sensor eine eigene Warteschlange. Geprüft wird nur der
+        Zustand pro Sensor, kein Frame wird dafür aus einer Warteschlange entnommen und wieder eingereiht.
+        Die Suche beginnt reihum nach dem zuletzt bedienten Sensor, damit kein Sensor verhungert.
+        """
         if self.mode == LORA_DATALINK_MODE_SENSOR:
-            return self._transmitQueue.pop_sync()
-
-        frames_to_check = []
-        active_frame = None
-
-        # Alle Frames aus der Warteschlange extrahieren
-        while len(self._transmitQueue) > 0:
-            frame = self._transmitQueue.pop_sync()
-            if frame is not None:
-                frames_to_check.append(frame)
-
-        # Frames prüfen und das erste für einen aktiven Sensor finden
-        for frame in frames_to_check:
-            sensor_address = frame.address
-            state = SensorState.get_state_by_address(sensor_address)
-
-            if state is not None and state.is_active():
-                # Aktiver Sensor gefunden - dieses Frame senden
-                if active_frame is None:
-                    active_frame = frame
-                    _log(f"Found frame for active sensor {sensor_address.hex()}", LOGLEVEL_DEBUG)
-                else:
-                    # Weitere Frames für aktive Sensoren zurück in die Warteschlange
-                    self._transmitQueue.put_sync(frame)
-            else:
-                # Sensor ist inaktiv - Frame zurück in die Warteschlange für späteren Versuch
-                self._transmitQueue.put_sync(frame)
-                sensor_hex = sensor_address.hex() if sensor_address else "unknown"
-                #_log(f"Keeping frame for inactive sensor {sensor_hex} in queue", LOGLEVEL_DEBUG)
+            if len(self._transmitQueue) == 0:
+                return None
+            return self._transmitQueue.popleft()
 
-        return active_frame
+        if self._tx_pending == 0:
+            return None
+        # Über eine Momentaufnahme iterieren: Anwendungs-Threads können über add_to_send_queue()
+        # gleichzeitig neue Warteschlangen anlegen
+        queues = tuple(self._transmit_queues.items())
+        count = len(queues)
+        get_state_by_address = SensorState.get_state_by_address
+        start = self._tx_cursor % count if count else 0
+        queued = False
+        for offset in range(count):
+            index = (start + offset) % count
+            sensor_address, queue = queues[index]
+            if len(queue) == 0:
+                continue
+            queued = True
+            state = get_state_by_address(sensor_address)
+            if state is not None and state.is_active(now):
+                if _DBG:
+                    _log(f"Found frame for active sensor {sensor_address.hex()}", LOGLEVEL_DEBUG)
+                self._tx_cursor = index + 1
+                with self._tx_lock:
+                    self._tx_pending -= 1
+                return queue.popleft()
+        if not queued:
+            # Zähler weicht ab (z.B. wenn appendleft() auf eine volle Warteschlange verworfen hat): neu zählen
+            with self._tx_lock:
+                self._tx_pending = sum(len(queue) for queue in self._transmit_queues.values())
+        return None
+
+    def _requeue_front(self, lora_dataframe: LoRaDataFrame):
+        """
+        Reiht einen nicht gesendeten Dataframe wieder am Anfang seiner Warteschlange ein.
+        """
+        self._transmit_queue_for(lora_dataframe.address).appendleft(lora_dataframe)
+        if self.mode == LORA_DATALINK_MODE_GATEWAY:
+            with self._tx_lock:
+                self._tx_pending += 1
 
     def _handle_busy_error(self):
         self._transmission_block = True
-        _log("Attempting recovery after BUSY timeout while sending...")
+        _log("Attempting recovery after BUSY timeout...")
         time.sleep_ms(1000)
         try:
-            # Versuche, das Modem in einen bekannten Zustand zu bringen
+            # Versuche, das Modem in einen bekannten Zustand zu bringen. Keine feste Pause nach
+            # standby(): der Treiber wartet vor jedem Kommando ohnehin auf die BUSY-Leitung
             self._driver.standby()
-            time.sleep_ms(500)
-            self._will_irq = self._driver.start_recv(continuous=True, timeout_ms=None)
+            self._begin_rx()
             if (self._busy_timeout_retries == 10 and self.mode == LORA_DATALINK_MODE_SENSOR):
                 machine.reset()
             _log("Recovery successful")
             self._busy_timeout_retries += 1
         except Exception as recover_error:
-            _log(f"Recovery failed: {recover_error}")
+            if _DBG:
+                _log(f"Recovery failed: {recover_error}")
             time.sleep_ms(2000)  # Längere Pause nach gescheitertem Recovery
         finally:
+            _collect_if_needed()
             self._transmission_block = False
 
     def add_to_send_queue(self, data: bytes):
@@ -399,29 +651,30 @@ class LoRaDataLink(Singleton):
                 raise RuntimeError(
                     f"Cannot add packet to DataLinkQueue because we dont hava a socket record for this socket-id: {socket_id}")
             lora_dataframe = LoRaDataFrame(state.sensor_address, LoRaTCP_Segment, data)
-            self._transmitQueue.put_sync(lora_dataframe)
+            with self._tx_lock:
+                if not _append_dropping_oldest(self._transmit_queue_for(state.sensor_address), lora_dataframe):
+                    self._tx_pending += 1
             if not state.is_active():
                 # TCP mitteilen das Sensor inaktiv ist
-                socket = None # type: LoRaTCP
-                for sock in self.sockets:  # type: LoRaTCP
-                    if sock.tcb.socket_id == socket_id:
-                        socket = sock
+                socket = self._sockets_by_id.get(socket_id)  # type: LoRaTCP
                 if socket is not None:
                     _log("Sensor became inactive. Telling TCP socket", LOGLEVEL_INFO)
                     socket.pause_timer()
         else:
             lora_dataframe = LoRaDataFrame(self.sensor_address, LoRaTCP_Segment, data)
-            self._transmitQueue.put_sync(lora_dataframe)
+            _append_dropping_oldest(self._transmitQueue, lora_dataframe)
 
     def is_sleep_ready(self) -> bool:
         """
         Prüft, ob momentan keine Pakete gesendet oder empfangen werden,
         damit Energiesparmodus aktiviert werden kann.
         """
-        _log(
-            f"is_sleep_ready: transmitQueue={len(self._transmitQueue)}, receiveQueue={len(self._receiveQueue)} -> {len(self._transmitQueue) == 0 and len(self._receiveQueue) == 0}",
-            LOGLEVEL_INFO)
-        return len(self._transmitQueue) == 0 and len(self._receiveQueue) == 0
+        transmit_pending = len(self._transmitQueue) + self._tx_pending
+        if _INFO:
+            _log(
+                f"is_sleep_ready: transmitQueue={transmit_pending} -> {transmit_pending == 0}",
+                LOGLEVEL_INFO)
+        return transmit_pending == 0
 
     def woke_up(self) -> None:
         """
@@ -431,18 +684,24 @@ class LoRaDataLink(Singleton):
         if self.mode == LORA_DATALINK_MODE_GATEWAY:
             raise Exception("[LoRaDataLink] Called woke_up method with mode LORA_DATALINK_MODE_GATEWAY")
         _log("Woke-up")
+        driver = self._driver
+        sleep_ms = time.sleep_ms
         self._busy_timeout_retries = 0
-        time.sleep_ms(100)
-        wake_up_message = LoRaDataFrame(self.sensor_address, LoRaDataLink_Woke_Up, b'')
-        self._driver.standby()
-        time.sleep_ms(100)
-        self._driver.send(wake_up_message.to_bytes())
+        sleep_ms(100)
+        driver.standby()
+        sleep_ms(100)
+        driver.send(self._wake_up_frame)
         _log("Sent Woke-up message")
         self._transmission_block = False
-        time.sleep_ms(50)
+        sleep_ms(50)
 
     def remove_socket(self, socket: "LoRaTCP"):
         self.sockets.remove(socket)
+        # tcb.socket_id wurde von TCB.delete() bereits zurückgesetzt, daher über den Socket suchen
+        for socket_id, sock in self._sockets_by_id.items():
+            if sock is socket:
+                del self._sockets_by_id[socket_id]
+                break
 
     def prepare_for_sleep(self):
         self._transmission_block = True
@@ -3,19 +3,22 @@ import random
 from collections import deque
 
 from LoRaNetworking.LoRaDataLink import LoRaDataLink, LoRaDataFrame
-from LoRaNetworking.LoRaTCPSegment import LoRaTCPSegment, Seq
+from LoRaNetworking.LoRaTCPSegment import LoRaTCPSegment, seq_lt, seq_le, seq_gt, seq_add
 from LoRaNetworking.TCB import TCB
 
 try:
     from typing import Dict, Deque
 except ImportError:
     pass
+import _thread
 import gc
 from micropython import const
 import time
 
 # DATAFRAME_MAX_PAYLOAD_LENGTH - Header(1 + 2 + 2 + 1) -> 242: Socket_ID, Flags, Seq_Number, ACK_Number
 LoRaTCP_MAX_PAYLOAD_SIZE = const(243)
+# Maximale Anzahl empfangener, noch nicht verarbeiteter Dataframes pro Socket
+INCOMING_QUEUE_SIZE = const(32)
 
 LOGLEVEL_DEBUG = const(0)
 LOGLEVEL_INFO = const(1)
@@ -23,20 +26,24 @@ LOGLEVEL_WARNING = const(2)
 LOGLEVEL_ERROR = const(3)
 
 TCP_LOG_LEVEL = const(LOGLEVEL_WARNING)
-
-TCB_STATES = {
-    0: "STATE_CLOSED",
-    1: "STATE_LISTEN",
-    2: "STATE_SYN_RCVD",
-    3: "STATE_SYN_SENT",
-    4: "STATE_ESTAB",
-    5: "STATE_FIN_WAIT_1",
-    6: "STATE_CLOSE_WAIT",
-    7: "STATE_FIN_WAIT_2",
-    8: "STATE_CLOSING",
-    9: "STATE_LAST_ACK",
-    10: "STATE_TIME_WAIT"
-}
+# Vorab ausgewertet: Nachrichten werden nur formatiert, wenn sie auch ausgegeben werden
+_DBG = TCP_LOG_LEVEL == LOGLEVEL_DEBUG
+_INFO = TCP_LOG_LEVEL <= LOGLEVEL_INFO
+
+# Namen der TCB-Zustände, der Zustandswert ist der Index (statt Dict: kein Hashing)
+TCB_STATES = (
+    "STATE_CLOSED",  # 0
+    "STATE_LISTEN",  # 1
+    "STATE_SYN_RCVD",  # 2
+    "STATE_SYN_SENT",  # 3
+    "STATE_ESTAB",  # 4
+    "STATE_FIN_WAIT_1",  # 5
+    "STATE_CLOSE_WAIT",  # 6
+    "STATE_FIN_WAIT_2",  # 7
+    "STATE_CLOSING",  # 8
+    "STATE_LAST_ACK",  # 9
+    "STATE_TIME_WAIT"  # 10
+)
 
 
 def _log(message: str, loglevel=LOGLEVEL_DEBUG):
@@ -50,28 +57,21 @@ def _log(message: str, loglevel=LOGLEVEL_DEBUG):
         print(f"[LoRaTCP] \033[31mError: {message}\033[0m")
 
 
-def ip_to_int(ip_str: str) -> int:
+def address_to_bytes(ip_str: str, port: int) -> bytes:
     """
-    Konvertiert IPv4-String zu 32-Bit Integer
+    Konvertiert IPv4-String und Port direkt in die 6 Bytes (Big Endian) der SYN-Payload,
+    ohne Umweg über einen Integer und ohne Verkettung von Teilstücken
     """
     parts = ip_str.split('.')
     if len(parts) != 4:
         raise ValueError(f"Ungültige IPv4-Adresse: {ip_str}")
-
-    result = 0
-    for i, part in enumerate(parts):
-        octet = int(part)
-        if not (0 <= octet <= 255):
-            raise ValueError(f"Ungültiges IPv4-Oktett: {octet}")
-        result |= (octet << (8 * (3 - i)))
-    return result
-
-
-def int_to_ip(ip_int: int) -> str:
-    """
-    Konvertiert 32-Bit Integer zu IPv4-String
-    """
-    return f"{(ip_int >> 24) & 0xFF}.{(ip_int >> 16) & 0xFF}.{(ip_int >> 8) & 0xFF}.{ip_int & 0xFF}"
+    a, b, c, d = int(parts[0]), int(parts[1]), int(parts[2]), int(parts[3])
+    # Ein Oktett außerhalb von 0..255 (auch negativ) setzt Bits oberhalb von Bit 7
+    if (a | b | c | d) >> 8:
+        raise ValueError(f"Ungültiges IPv4-Oktett in: {ip_str}")
+    if port >> 16:
+        raise ValueError(f"Ungültiger Port: {port}")
+    return bytes((a, b, c, d, port >> 8, port & 0xFF))
 
 
 class LoRaTCP:
@@ -87,6 +87,12 @@ class LoRaTCP:
     MAX_RETRANSMISSION_ATTEMPTS = 25
 
     INSTANCES = list()
+    # Parallel zu INSTANCES: die gebundenen run()-Methoden, damit der Netzwerk-Thread
+    # pro Socket und Durchlauf keinen Methoden-Lookup ausführen muss
+    RUN_METHODS = list()
+    # Schützt das gemeinsame Eintragen/Entfernen in INSTANCES und RUN_METHODS. close() kann aus
+    # Anwendungs-Threads und aus dem Netzwerk-Thread kommen, die Listen dürfen nicht auseinanderlaufen
+    INSTANCES_LOCK = _thread.allocate_lock()
     __slots__ = ('_data_link', 'tcb', '_incoming_dataframes', '_last_run', '_timeout', '_blocking',
                  '_last_retransmission_sequence_number', '_retransmission_attempts')
 
@@ -101,14 +107,18 @@ class LoRaTCP:
         _log("Initializing new LoRaTCP instance", LOGLEVEL_INFO)
         self.tcb = TCB("", 0)  # type: TCB
         self._data_link = LoRaDataLink()
-        self._incoming_dataframes = list()
+        # deque statt Liste: popleft() verschiebt nicht bei jedem Frame den restlichen Inhalt
+        self._incoming_dataframes = deque((), INCOMING_QUEUE_SIZE)
         self._last_run = time.ticks_ms()
         self._timeout = None
         self._blocking = False
         self._last_retransmission_sequence_number = None
         self._retransmission_attempts = 0
-        LoRaTCP.INSTANCES.append(self)
-        _log(f"LoRaTCP instance created. Total instances: {len(LoRaTCP.INSTANCES)}", LOGLEVEL_INFO)
+        with LoRaTCP.INSTANCES_LOCK:
+            LoRaTCP.INSTANCES.append(self)
+            LoRaTCP.RUN_METHODS.append(self.run)
+        if _INFO:
+            _log(f"LoRaTCP instance created. Total instances: {len(LoRaTCP.INSTANCES)}", LOGLEVEL_INFO)
 
     def connect(self, peer):
         """
@@ -125,28 +135,33 @@ class LoRaTCP:
             OSError: Wenn das Socket nicht im CLOSED-Zustand ist
         """
         address, port = peer
-        _log(f"Attempting connection to peer: {address}:{port}", LOGLEVEL_INFO)
+        if _INFO:
+            _log(f"Attempting connection to peer: {address}:{port}", LOGLEVEL_INFO)
         if self.tcb.state == TCB.STATE_CLOSED:
-            _log("Connecting to {}:{}".format(address, port))
-            _log(f"Setting remote address: {address}, remote port: {port}", LOGLEVEL_DEBUG)
+            if _DBG:
+                _log("Connecting to {}:{}".format(address, port))
+            if _DBG:
+                _log(f"Setting remote address: {address}, remote port: {port}", LOGLEVEL_DEBUG)
             self.tcb.remote_ip = address
             self.tcb.remote_port = port
 
-            _log(f"Creating SYN segment with socket_id={self.tcb.socket_id}, "
-                 f"seq={self.tcb.iss}", LOGLEVEL_DEBUG)
-            payload = (ip_to_int(self.tcb.remote_ip).to_bytes(4, 'big') +
-                       self.tcb.remote_port.to_bytes(2, 'big'))
+            if _DBG:
+                _log(f"Creating SYN segment with socket_id={self.tcb.socket_id}, "
+                     f"seq={self.tcb.iss}", LOGLEVEL_DEBUG)
+            payload = address_to_bytes(self.tcb.remote_ip, self.tcb.remote_port)
             new_seg = LoRaTCPSegment(self.tcb.socket_id, self.tcb.iss, syn_flag=True,
                                      ack_flag=False, payload=payload)
             self.tcb.snd_una = self.tcb.iss
             self.tcb.snd_nxt = self.tcb.iss
-            _log(f"Updated send variables: snd_una={self.tcb.snd_una}, "
-                 f"snd_nxt={self.tcb.snd_nxt}", LOGLEVEL_DEBUG)
+            if _DBG:
+                _log(f"Updated send variables: snd_una={self.tcb.snd_una}, "
+                     f"snd_nxt={self.tcb.snd_nxt}", LOGLEVEL_DEBUG)
             self._data_link.register_syn_sent_socket(self)
             _log("Registered socket with data link", LOGLEVEL_DEBUG)
             self.send_segment(new_seg)
             self.tcb.state = TCB.STATE_SYN_SENT
-            _log(f"State changed to SYN_SENT. Connection initiation complete", LOGLEVEL_INFO)
+            if _INFO:
+                _log(f"State changed to SYN_SENT. Connection initiation complete", LOGLEVEL_INFO)
         else:
             _log(f"Cannot connect: socket not in CLOSED state (current state: {TCB_STATES[self.tcb.state]})",
                  LOGLEVEL_ERROR)
@@ -173,8 +188,9 @@ class LoRaTCP:
             self.tcb.snd_nxt = self.tcb.iss
             self.tcb.active_open = False
             self.tcb.state = TCB.STATE_LISTEN
-            _log(f"TCB configured: active_open={self.tcb.active_open}, state={TCB_STATES[self.tcb.state]}",
-                 LOGLEVEL_DEBUG)
+            if _DBG:
+                _log(f"TCB configured: active_open={self.tcb.active_open}, state={TCB_STATES[self.tcb.state]}",
+                     LOGLEVEL_DEBUG)
             self._data_link.register_listening_socket(self)
             _log("Socket registered with data link as listening socket", LOGLEVEL_INFO)
             while self.tcb.state == TCB.STATE_LISTEN:
@@ -197,7 +213,8 @@ class LoRaTCP:
                     0 (nicht-blockierend),
                     float (blockierend mit Timeout in Sekunden)
         """
-        _log(f"Setting timeout: {timeout}", LOGLEVEL_DEBUG)
+        if _DBG:
+            _log(f"Setting timeout: {timeout}", LOGLEVEL_DEBUG)
         if timeout is None:
             self._blocking = True
             self._timeout = None
@@ -209,7 +226,8 @@ class LoRaTCP:
         else:
             self._blocking = True
             self._timeout = timeout
-            _log(f"Socket set to blocking mode with timeout: {timeout}s", LOGLEVEL_DEBUG)
+            if _DBG:
+                _log(f"Socket set to blocking mode with timeout: {timeout}s", LOGLEVEL_DEBUG)
 
     def setblocking(self, flag):
         """
@@ -221,7 +239,8 @@ class LoRaTCP:
         Args:
             flag: True für blockierenden Modus, False für nicht-blockierenden Modus
         """
-        _log(f"Setting blocking flag: {flag}", LOGLEVEL_DEBUG)
+        if _DBG:
+            _log(f"Setting blocking flag: {flag}", LOGLEVEL_DEBUG)
         self._blocking = bool(flag)
         if flag:
             self._timeout = None
@@ -249,20 +268,25 @@ class LoRaTCP:
         if size is not None:
             # Nur die ersten 'size' Bytes senden
             actual_data = data[:size]
-            _log(
-                f"Write called with data length: {len(data)}, size parameter: {size}, sending: {len(actual_data)} bytes",
-                LOGLEVEL_DEBUG)
-            _log(f"Write data (limited): {actual_data.hex()}", LOGLEVEL_INFO)
+            if _DBG:
+                _log(
+                    f"Write called with data length: {len(data)}, size parameter: {size}, sending: {len(actual_data)} bytes",
+                    LOGLEVEL_DEBUG)
+            if _INFO:
+                _log(f"Write data (limited): {actual_data.hex()}", LOGLEVEL_INFO)
         else:
             # Alle Daten senden
             actual_data = data
-            _log(f"Write called with data length: {len(data)}, size parameter: {size}", LOGLEVEL_DEBUG)
-            _log(f"Write data (full): {actual_data.hex()}", LOGLEVEL_INFO)
+            if _DBG:
+                _log(f"Write called with data length: {len(data)}, size parameter: {size}", LOGLEVEL_DEBUG)
+            if _INFO:
+                _log(f"Write data (full): {actual_data.hex()}", LOGLEVEL_INFO)
 
         self.send(actual_data)  # send() ohne size parameter
 
         bytes_written = len(actual_data)
-        _log(f"Write completed, returned: {bytes_written}", LOGLEVEL_DEBUG)
+        if _DBG:
+            _log(f"Write completed, returned: {bytes_written}", LOGLEVEL_DEBUG)
         return bytes_written
 
     def send(self, data: bytes):
@@ -282,32 +306,37 @@ class LoRaTCP:
                     - "foreign socket unspecified" (LISTEN)
                     - "connection closing" (FIN_WAIT_*, CLOSING, etc.)
         """
-        _log(f"Send called with data length: {len(data)}, current state: {self.tcb.state}, data: {data.hex()}",
-             LOGLEVEL_INFO)
+        if _INFO:
+            _log(f"Send called with data length: {len(data)}, current state: {self.tcb.state}, data: {data.hex()}",
+                 LOGLEVEL_INFO)
         if self.tcb.state == TCB.STATE_CLOSED:
             _log("Cannot send: connection does not exist", LOGLEVEL_ERROR)
             raise OSError("connection does not exist")
         elif self.tcb.state == TCB.STATE_LISTEN:
             _log("Cannot send: foreign socket unspecified", LOGLEVEL_ERROR)
             raise OSError("foreign socket unspecified")
-        elif self.tcb.state in [TCB.STATE_SYN_SENT, TCB.STATE_SYN_RCVD]:
-            _log(f"State {self.tcb.state}: Queuing data for transmission after ESTABLISHED", LOGLEVEL_DEBUG)
+        elif self.tcb.state in (TCB.STATE_SYN_SENT, TCB.STATE_SYN_RCVD):
+            if _DBG:
+                _log(f"State {self.tcb.state}: Queuing data for transmission after ESTABLISHED", LOGLEVEL_DEBUG)
             with self.tcb.send_buffer_lock:
-                prev_len = len(self.tcb.send_buffer)
-                self.tcb.send_buffer = self.tcb.send_buffer + data
-                _log(f"Send buffer updated: {prev_len} -> {len(self.tcb.send_buffer)} bytes", LOGLEVEL_DEBUG)
+                prev_len = self.tcb.send_buffer_len
+                self.tcb.append_send_data(data)
+                if _DBG:
+                    _log(f"Send buffer updated: {prev_len} -> {self.tcb.send_buffer_len} bytes", LOGLEVEL_DEBUG)
                 # Queue the data for transmission after entering ESTABLISHED state.
-        elif self.tcb.state in [TCB.STATE_ESTAB, TCB.STATE_CLOSE_WAIT]:
+        elif self.tcb.state in (TCB.STATE_ESTAB, TCB.STATE_CLOSE_WAIT):
             # Segmentize the buffer and send it with a piggybacked acknowledgment (acknowledgment value = RCV.NXT).
             #   If there is insufficient space to remember this buffer, simply return "error: insufficient resources".
-            _log(f"State {self.tcb.state}: Adding data to send buffer for immediate transmission", LOGLEVEL_DEBUG)
+            if _DBG:
+                _log(f"State {self.tcb.state}: Adding data to send buffer for immediate transmission", LOGLEVEL_DEBUG)
             with self.tcb.send_buffer_lock:
-                prev_len = len(self.tcb.send_buffer)
-                self.tcb.send_buffer = self.tcb.send_buffer + data
-                _log(f"Send buffer updated: {prev_len} -> {len(self.tcb.send_buffer)} bytes", LOGLEVEL_DEBUG)
-        elif self.tcb.state in [TCB.STATE_FIN_WAIT_1, TCB.STATE_FIN_WAIT_2,
+                prev_len = self.tcb.send_buffer_len
+                self.tcb.append_send_data(data)
+                if _DBG:
+                    _log(f"Send buffer updated: {prev_len} -> {self.tcb.send_buffer_len} bytes", LOGLEVEL_DEBUG)
+        elif self.tcb.state in (TCB.STATE_FIN_WAIT_1, TCB.STATE_FIN_WAIT_2,
                                 TCB.STATE_CLOSING, TCB.STATE_LAST_ACK,
-                                TCB.STATE_TIME_WAIT]:
+                                TCB.STATE_TIME_WAIT):
             _log(f"Cannot send: connection closing (state: {self.tcb.state})", LOGLEVEL_ERROR)
             raise OSError("connection closing")
 
@@ -340,19 +369,20 @@ class LoRaTCP:
             _log("Cannot read: Socket is closed", LOGLEVEL_ERROR)
             raise OSError("Socket is closed")
 
-        if self.tcb.state in [TCB.STATE_LISTEN, TCB.STATE_SYN_SENT]:
-            _log(f"Cannot read: No data available in state {TCB_STATES[self.tcb.state]}", LOGLEVEL_DEBUG)
+        if self.tcb.state in (TCB.STATE_LISTEN, TCB.STATE_SYN_SENT):
+            if _DBG:
+                _log(f"Cannot read: No data available in state {TCB_STATES[self.tcb.state]}", LOGLEVEL_DEBUG)
             if not self._blocking:
                 return None
             # For blocking sockets, wait for connection establishment
 
-        # _log(f"Available data before read: {len(self.tcb.reassembled_data)} bytes", LOGLEVEL_DEBUG)
+        # _log(f"Available data before read: {self.tcb.reassembled_data_len()} bytes", LOGLEVEL_DEBUG)
 
         start_time = time.ticks_ms()
         iterations = 0
 
         # Warte auf MINDESTENS 1 Byte, nicht auf bufsize Bytes
-        while len(self.tcb.reassembled_data) == 0:  # ← NUR bis IRGENDWELCHE Daten da sind
+        while self.tcb.reassembled_data_len() == 0:  # ← NUR bis IRGENDWELCHE Daten da sind
             iterations += 1
 
             if self._blocking:
@@ -363,8 +393,9 @@ class LoRaTCP:
                         raise OSError(110)  # ETIMEDOUT
 
                 if iterations % 100 == 0:  # Spam verhindern
-                    _log(f"Blocking read iteration {iterations}, "
-                         f"elapsed: {(time.ticks_ms() - start_time) / 1000:.2f}s", LOGLEVEL_DEBUG)
+                    if _DBG:
+                        _log(f"Blocking read iteration {iterations}, "
+                             f"elapsed: {(time.ticks_ms() - start_time) / 1000:.2f}s", LOGLEVEL_DEBUG)
                 time.sleep_ms(10)
             else:
                 # Non-blocking: Sofortiger Return
@@ -374,14 +405,14 @@ class LoRaTCP:
 
         # Gib verfügbare Daten zurück (bis maximum bufsize)
         with self.tcb.reassembled_data_lock:
-            actual_read = min(bufsize, len(self.tcb.reassembled_data))
-            data = self.tcb.reassembled_data[:actual_read]
-            # Lösche gelesene Daten aus dem TCB
-            self.tcb.reassembled_data = self.tcb.reassembled_data[actual_read:]
-
-        _log(
-            f"Read completed: requested={bufsize}, actual={actual_read}, "
-            f"remaining={len(self.tcb.reassembled_data)}, data: {data.hex()}", LOGLEVEL_INFO)
+            # Entnimmt die gelesenen Daten aus dem TCB
+            data = self.tcb.take_reassembled_data(bufsize)
+            actual_read = len(data)
+
+        if _INFO:
+            _log(
+                f"Read completed: requested={bufsize}, actual={actual_read}, "
+                f"remaining={self.tcb.reassembled_data_len()}, data: {data.hex()}", LOGLEVEL_INFO)
         return data
 
     def close(self):
@@ -398,7 +429,8 @@ class LoRaTCP:
         - CLOSE_WAIT: Sendet FIN (Antwort auf empfangenes FIN)
         - Andere Zustände: Bereits im Schließvorgang
         """
-        _log(f"Close called, current state: {TCB_STATES[self.tcb.state]}", LOGLEVEL_INFO)
+        if _INFO:
+            _log(f"Close called, current state: {TCB_STATES[self.tcb.state]}", LOGLEVEL_INFO)
         if self.tcb.state == TCB.STATE_CLOSED:
             # If the user does not have access to such a connection, return "error: connection illegal for this process".
             _log("Cannot close: connection does not exist", LOGLEVEL_WARNING)
@@ -426,8 +458,9 @@ class LoRaTCP:
                 LoRaTCPSegment(self.tcb.socket_id, seq=self.tcb.snd_nxt, ack=self.tcb.rcv_nxt, ack_flag=True,
                                fin_flag=True))
             self.tcb.state = TCB.STATE_FIN_WAIT_1
-            _log(f"State changed to FIN_WAIT_1", LOGLEVEL_INFO)
-        elif self.tcb.state in [TCB.STATE_FIN_WAIT_1, TCB.STATE_FIN_WAIT_2]:
+            if _INFO:
+                _log(f"State changed to FIN_WAIT_1", LOGLEVEL_INFO)
+        elif self.tcb.state in (TCB.STATE_FIN_WAIT_1, TCB.STATE_FIN_WAIT_2):
             _log("connection closing", LOGLEVEL_ERROR)
         elif self.tcb.state == TCB.STATE_CLOSE_WAIT:
             # Queue this request until all preceding SENDs have been segmentized; then send a FIN segment, enter LAST_ACK state.
@@ -436,8 +469,9 @@ class LoRaTCP:
                 LoRaTCPSegment(self.tcb.socket_id, seq=self.tcb.snd_nxt, ack=self.tcb.rcv_nxt, ack_flag=True,
                                fin_flag=True))
             self.tcb.state = TCB.STATE_LAST_ACK
-            _log(f"State changed to LAST_ACK", LOGLEVEL_INFO)
-        elif self.tcb.state in [TCB.STATE_LAST_ACK, TCB.STATE_TIME_WAIT, TCB.STATE_CLOSING]:
+            if _INFO:
+                _log(f"State changed to LAST_ACK", LOGLEVEL_INFO)
+        elif self.tcb.state in (TCB.STATE_LAST_ACK, TCB.STATE_TIME_WAIT, TCB.STATE_CLOSING):
             _log("connection closing", LOGLEVEL_ERROR)
 
     def add_lora_dataframe_to_queue(self, lora_dataframe: LoRaDataFrame):
@@ -451,9 +485,15 @@ class LoRaTCP:
         Args:
             lora_dataframe: Der empfangene LoRa-Datenrahmen
         """
-        _log(f"Adding LoRa dataframe to queue: payload_length={len(lora_dataframe.payload)}", LOGLEVEL_DEBUG)
+        if _DBG:
+            _log(f"Adding LoRa dataframe to queue: payload_length={len(lora_dataframe.payload)}", LOGLEVEL_DEBUG)
+        if len(self._incoming_dataframes) >= INCOMING_QUEUE_SIZE:
+            # Überlast: ältesten Frame verwerfen, das Segment wird vom Sender erneut übertragen
+            self._incoming_dataframes.popleft()
+            _log("Incoming dataframe queue full. Dropped oldest dataframe", LOGLEVEL_WARNING)
         self._incoming_dataframes.append(lora_dataframe)
-        _log(f"Queue length after addition: {len(self._incoming_dataframes)}", LOGLEVEL_DEBUG)
+        if _DBG:
+            _log(f"Queue length after addition: {len(self._incoming_dataframes)}", LOGLEVEL_DEBUG)
 
     def _internal_close_call(self):
         """
@@ -466,12 +506,18 @@ class LoRaTCP:
         - Entfernt Instanz aus globaler Liste
         """
         _log("Performing internal close call", LOGLEVEL_DEBUG)
-        _log(f"Cleaning up TCB: retransmission_queue_length={len(self.tcb.retransmission_queue)}", LOGLEVEL_DEBUG)
+        if _DBG:
+            _log(f"Cleaning up TCB: retransmission_queue_length={len(self.tcb.retransmission_queue)}", LOGLEVEL_DEBUG)
         self.tcb.delete()
         self._data_link.remove_socket(self)
         _log("Socket removed from data link", LOGLEVEL_DEBUG)
-        LoRaTCP.INSTANCES.remove(self)
-        _log(f"Instance removed from global list. Remaining instances: {len(LoRaTCP.INSTANCES)}", LOGLEVEL_INFO)
+        # Über den Index entfernen, damit RUN_METHODS parallel zu INSTANCES bleibt
+        with LoRaTCP.INSTANCES_LOCK:
+            index = LoRaTCP.INSTANCES.index(self)
+            del LoRaTCP.INSTANCES[index]
+            del LoRaTCP.RUN_METHODS[index]
+        if _INFO:
+            _log(f"Instance removed from global list. Remaining instances: {len(LoRaTCP.INSTANCES)}", LOGLEVEL_INFO)
 
     def _check_time_wait_timer(self):
         """
@@ -483,7 +529,8 @@ class LoRaTCP:
 
         elapsed = time.ticks_diff(time.ticks_ms(), self.tcb.time_wait_timer)
         if elapsed > TCB.TIME_WAIT_TIMEOUT_MS:
-            _log(f"Time-wait timer expired after {elapsed}ms (timeout: {TCB.TIME_WAIT_TIMEOUT_MS}ms)", LOGLEVEL_INFO)
+            if _INFO:
+                _log(f"Time-wait timer expired after {elapsed}ms (timeout: {TCB.TIME_WAIT_TIMEOUT_MS}ms)", LOGLEVEL_INFO)
             self.tcb.state = TCB.STATE_CLOSED
             self._internal_close_call()
 
@@ -514,9 +561,10 @@ class LoRaTCP:
                     self._last_retransmission_sequence_number = segment.seq
                     self._retransmission_attempts = 0
 
-                _log(
-                    f"Attempt {self._retransmission_attempts} retransmitting segment: seq={segment.seq}, payload_len={len(segment.payload)}",
-                    LOGLEVEL_INFO)
+                if _INFO:
+                    _log(
+                        f"Attempt {self._retransmission_attempts} retransmitting segment: seq={segment.seq}, payload_len={len(segment.payload)}",
+                        LOGLEVEL_INFO)
 
                 if self._retransmission_attempts >= LoRaTCP.MAX_RETRANSMISSION_ATTEMPTS:
                     _log("Retransmission attempt limit reached. Sending RST", LOGLEVEL_WARNING)
@@ -525,8 +573,7 @@ class LoRaTCP:
                     self.close()
 
                 if not segment.syn_flag:
-                    segment.ack = self.tcb.rcv_nxt
-                    segment.ack_flag = True
+                    segment.set_ack(self.tcb.rcv_nxt)
                 self.send_segment(segment, is_retransmission=True)
                 self.tcb.start_retransmission_timeout_timer()
                 _log("Retransmission timer restarted", LOGLEVEL_DEBUG)
@@ -549,6 +596,10 @@ class LoRaTCP:
 
         Die Methode ist darauf ausgelegt, effizient ohne Blockierung zu arbeiten
         und sollte in der Hauptschleife des Netzwerk-Threads aufgerufen werden.
+
+        Returns:
+            bool: True wenn Dataframes verarbeitet oder Segmente gesendet wurden,
+                  damit der Netzwerk-Thread bei Leerlauf schlafen kann
         """
         current_time = time.ticks_ms()
         time_since_last_run = time.ticks_diff(current_time, self._last_run)
@@ -561,20 +612,24 @@ class LoRaTCP:
         # Process incoming dataframes
         incoming_count = len(self._incoming_dataframes)
         if incoming_count > 0:
-            _log(f"Processing {incoming_count} incoming dataframes", LOGLEVEL_DEBUG)
+            if _DBG:
+                _log(f"Processing {incoming_count} incoming dataframes", LOGLEVEL_DEBUG)
 
         processed_frames = 0
-        while len(self._incoming_dataframes) > 0:
-            lora_dataframe: LoRaDataFrame = self._incoming_dataframes.pop(0)
-            _log(f"Processing dataframe {processed_frames + 1}: payload_length={len(lora_dataframe.payload)}",
-                 LOGLEVEL_DEBUG)
+        incoming_dataframes = self._incoming_dataframes
+        while len(incoming_dataframes) > 0:
+            lora_dataframe: LoRaDataFrame = incoming_dataframes.popleft()
+            if _DBG:
+                _log(f"Processing dataframe {processed_frames + 1}: payload_length={len(lora_dataframe.payload)}",
+                     LOGLEVEL_DEBUG)
 
             try:
                 # Parse TCP segment with error handling for malformed data
                 seg = LoRaTCPSegment.from_bytes(lora_dataframe.payload)  # type: LoRaTCPSegment
-                _log(
-                    f"Parsed TCP segment: socket_id={seg.socket_id}, seq={seg.seq}, ack={seg.ack}, flags=SYN:{seg.syn_flag},ACK:{seg.ack_flag},FIN:{seg.fin_flag},RST:{seg.rst_flag}",
-                    LOGLEVEL_INFO)
+                if _INFO:
+                    _log(
+                        f"Parsed TCP segment: socket_id={seg.socket_id}, seq={seg.seq}, ack={seg.ack}, flags=SYN:{seg.syn_flag},ACK:{seg.ack_flag},FIN:{seg.fin_flag},RST:{seg.rst_flag}",
+                        LOGLEVEL_INFO)
 
                 # Validate segment basic constraints
                 if not self._validate_segment(seg):
@@ -595,7 +650,8 @@ class LoRaTCP:
                 continue
 
         if processed_frames > 0:
-            _log(f"Processed {processed_frames} incoming dataframes", LOGLEVEL_DEBUG)
+            if _DBG:
+                _log(f"Processed {processed_frames} incoming dataframes", LOGLEVEL_DEBUG)
 
         # Auto-close connection if stuck in CLOSE_WAIT for too long
         if self.tcb.state == TCB.STATE_CLOSE_WAIT:
@@ -605,23 +661,23 @@ class LoRaTCP:
             elif time.ticks_diff(time.ticks_ms(), self.tcb._close_wait_timer) > 2000:  # 2 seconds
                 _log("Auto-closing connection after 2s in CLOSE_WAIT", LOGLEVEL_INFO)
                 self.close()
-                return
+                return True
 
         segments_sent = 0
-        if self.tcb.state in [TCB.STATE_ESTAB, TCB.STATE_CLOSE_WAIT, TCB.STATE_FIN_WAIT_1]:
+        if self.tcb.state in (TCB.STATE_ESTAB, TCB.STATE_CLOSE_WAIT, TCB.STATE_FIN_WAIT_1):
             # Process send buffer
-            send_buffer_len = len(self.tcb.send_buffer)
+            send_buffer_len = self.tcb.send_buffer_len
             if send_buffer_len > 0:
-                _log(f"Processing send buffer: {send_buffer_len} bytes pending", LOGLEVEL_DEBUG)
+                if _DBG:
+                    _log(f"Processing send buffer: {send_buffer_len} bytes pending", LOGLEVEL_DEBUG)
 
-            while len(self.tcb.send_buffer) > 0:
+            while self.tcb.send_buffer_len > 0:
                 with self.tcb.send_buffer_lock:
-                    payload_len = min(self.tcb.snd_wnd, len(self.tcb.send_buffer))
-                    payload = self.tcb.send_buffer[:payload_len]
-                    self.tcb.send_buffer = self.tcb.send_buffer[payload_len:]
-                    _log(
-                        f"Sending segment {segments_sent + 1}: payload_len={payload_len}, remaining_buffer={len(self.tcb.send_buffer)}",
-                        LOGLEVEL_DEBUG)
+                    payload = self.tcb.take_send_data(self.tcb.snd_wnd)
+                    if _DBG:
+                        _log(
+                            f"Sending segment {segments_sent + 1}: payload_len={len(payload)}, remaining_buffer={self.tcb.send_buffer_len}",
+                            LOGLEVEL_DEBUG)
                     new_seg = LoRaTCPSegment(self.tcb.socket_id, seq=self.tcb.snd_nxt, ack=self.tcb.rcv_nxt,
                                              ack_flag=True,
                                              payload=payload)
@@ -629,13 +685,15 @@ class LoRaTCP:
                     segments_sent += 1
 
             if segments_sent > 0:
-                _log(f"Sent {segments_sent} segments from send buffer", LOGLEVEL_INFO)
+                if _INFO:
+                    _log(f"Sent {segments_sent} segments from send buffer", LOGLEVEL_INFO)
 
         # Check timers
         if not self.tcb.timer_paused:
             self._check_retransmission_timer()
         self._check_time_wait_timer()
         # _log(f"Run method completed: processed={processed_frames} frames, sent={segments_sent} segments", LOGLEVEL_DEBUG)
+        return processed_frames > 0 or segments_sent > 0
 
     def handle_event_segment_arrives(self, seg: LoRaTCPSegment):
         """
@@ -660,9 +718,10 @@ class LoRaTCP:
         """
         state = self.tcb.state
         tcb = self.tcb
-        _log(
-            f"Handling segment arrival: socket_id={seg.socket_id}, seq={seg.seq}, ack={seg.ack}, current_state={TCB_STATES[state]}",
-            LOGLEVEL_DEBUG)
+        if _DBG:
+            _log(
+                f"Handling segment arrival: socket_id={seg.socket_id}, seq={seg.seq}, ack={seg.ack}, current_state={TCB_STATES[state]}",
+                LOGLEVEL_DEBUG)
         # _log(f"Segment flags: SYN={seg.syn_flag}, ACK={seg.ack_flag}, FIN={seg.fin_flag}, RST={seg.rst_flag}, payload_len={len(seg.payload)}", LOGLEVEL_DEBUG)
 
         # If the state is CLOSED (i.e., TCB does not exist) then
@@ -674,26 +733,31 @@ class LoRaTCP:
             # The acknowledgment and sequence field values are selected to make
             # the reset sequence acceptable to the TCP that sent the offending segment.
             if seg.rst_flag:
-                _log(f"STATE: CLOSED, Received Segment discarded because it contained RST flag: {seg}")
+                if _DBG:
+                    _log(f"STATE: CLOSED, Received Segment discarded because it contained RST flag: {seg}")
                 return
             else:
                 # If the ACK bit is off, sequence number zero is used,
                 # <SEQ=0><ACK=SEG.SEQ+SEG.LEN><CTL=RST,ACK>
                 if not seg.ack_flag:
-                    ack = Seq(seg.seq) + Seq(seg.payload)
-                    new_seg = LoRaTCPSegment(seg.socket_id, seq=Seq(0), ack=ack,
+                    ack = seq_add(seg.seq, len(seg.payload))
+                    new_seg = LoRaTCPSegment(seg.socket_id, seq=0, ack=ack,
                                              rst_flag=True, ack_flag=True)
-                    _log(
-                        f"STATE: CLOSED, Received Segment discarded. It contained no RST and ACK flag so we are sending a RST reply with Seq 0: {seg}")
-                    _log(f"Sending RST reply: seq=0, ack={ack}", LOGLEVEL_DEBUG)
+                    if _DBG:
+                        _log(
+                            f"STATE: CLOSED, Received Segment discarded. It contained no RST and ACK flag so we are sending a RST reply with Seq 0: {seg}")
+                    if _DBG:
+                        _log(f"Sending RST reply: seq=0, ack={ack}", LOGLEVEL_DEBUG)
                     self.send_segment(new_seg)
                 else:
                     # If the ACK bit is on,
                     # <SEQ=SEG.ACK><CTL=RST>
                     new_seg = LoRaTCPSegment(seg.socket_id, seq=seg.seq, rst_flag=True)
-                    _log(
-                        f"STATE: CLOSED, Received Segment discarded. It contained no RST flag so we are sending a RST reply with Seq SEG.SEQ: {seg}")
-                    _log(f"Sending RST reply: seq={seg.seq}", LOGLEVEL_DEBUG)
+                    if _DBG:
+                        _log(
+                            f"STATE: CLOSED, Received Segment discarded. It contained no RST flag so we are sending a RST reply with Seq SEG.SEQ: {seg}")
+                    if _DBG:
+                        _log(f"Sending RST reply: seq={seg.seq}", LOGLEVEL_DEBUG)
                     self.send_segment(new_seg)
             return
         # If the state is LISTEN then
@@ -704,7 +768,8 @@ class LoRaTCP:
             # first check for an RST
             if seg.rst_flag:
                 # An incoming RST should be ignored. Return.
-                _log(f"STATE: LISTEN, Received Segment discarded because it contained RST flag: {seg}")
+                if _DBG:
+                    _log(f"STATE: LISTEN, Received Segment discarded because it contained RST flag: {seg}")
                 return
 
             # second check for an ACK
@@ -714,8 +779,10 @@ class LoRaTCP:
                 # The RST should be formatted as follows:  <SEQ=SEG.ACK><CTL=RST>
                 # Quelle: RFC 793, p. 65
                 new_seg = LoRaTCPSegment(seg.socket_id, seq=seg.ack, rst_flag=True)
-                _log(f"STATE: LISTEN, Received Segment discarded because it contained ACK flag: {seg}")
-                _log(f"Sending RST reply for unexpected ACK: seq={seg.ack}", LOGLEVEL_DEBUG)
+                if _DBG:
+                    _log(f"STATE: LISTEN, Received Segment discarded because it contained ACK flag: {seg}")
+                if _DBG:
+                    _log(f"Sending RST reply for unexpected ACK: seq={seg.ack}", LOGLEVEL_DEBUG)
                 self.send_segment(new_seg)
                 return
             # third check for a SYN
@@ -736,24 +803,28 @@ class LoRaTCP:
                 # Set RCV.NXT to SEG.SEQ+1, IRS [Initial receive sequence number] is set to SEG.SEQ
                 # and any other control or text should be queued for processing later.
                 # Wir müssen remote-ip und remote-port acken!
-                self.tcb.rcv_nxt = Seq(seg.seq) + len(seg.payload) + 1
+                self.tcb.rcv_nxt = seq_add(seg.seq, len(seg.payload) + 1)
                 self.tcb.irs = seg.seq
-                _log(f"STATE: LISTEN, SYN received: RCV.NXT={self.tcb.rcv_nxt}, IRS={seg.seq}: {seg}")
+                if _DBG:
+                    _log(f"STATE: LISTEN, SYN received: RCV.NXT={self.tcb.rcv_nxt}, IRS={seg.seq}: {seg}")
                 # ISS should be selected and a SYN segment sent of the form:
                 #   <SEQ=ISS><ACK=RCV.NXT><CTL=SYN,ACK>
                 new_seg = LoRaTCPSegment(seg.socket_id,
-                                         seq=Seq(self.tcb.iss), ack=self.tcb.rcv_nxt,
+                                         seq=self.tcb.iss, ack=self.tcb.rcv_nxt,
                                          syn_flag=True, ack_flag=True)
-                _log(f"Sending SYN-ACK reply: seq={self.tcb.iss}, ack={self.tcb.rcv_nxt}", LOGLEVEL_DEBUG)
+                if _DBG:
+                    _log(f"Sending SYN-ACK reply: seq={self.tcb.iss}, ack={self.tcb.rcv_nxt}", LOGLEVEL_DEBUG)
                 self.send_segment(new_seg)
                 # SND.NXT is set to ISS+1 and SND.UNA to ISS.
-                self.tcb.snd_nxt = Seq(self.tcb.iss) + 1
+                self.tcb.snd_nxt = seq_add(self.tcb.iss, 1)
                 self.tcb.snd_una = self.tcb.iss
-                _log(f"STATE: LISTEN, SYN received: SND.NXT={self.tcb.snd_nxt}, SND.UNA={self.tcb.snd_una}")
+                if _DBG:
+                    _log(f"STATE: LISTEN, SYN received: SND.NXT={self.tcb.snd_nxt}, SND.UNA={self.tcb.snd_una}")
 
                 # The connection state should be changed to SYN-RECEIVED.
                 self.tcb.state = TCB.STATE_SYN_RCVD
-                _log(f"STATE: LISTEN, SYN received: Set STATE=SYN_RCVD")
+                if _DBG:
+                    _log(f"STATE: LISTEN, SYN received: Set STATE=SYN_RCVD")
                 # Note that any other incoming control or data (combined with SYN)
                 # will be processed in the SYN-RECEIVED state,
                 # but processing of SYN and ACK should not be repeated.
@@ -761,12 +832,15 @@ class LoRaTCP:
                 # If the listen was not fully specified (i.e., the foreign socket was not fully specified),
                 # then the unspecified fields should be filled in now.
                 # Quelle: RFC 793, p. 66
-                host = int_to_ip(int.from_bytes(seg.payload[:4], 'big'))
-                port = int.from_bytes(seg.payload[4:6], 'big')
+                # Adresse (4 Byte) und Port (2 Byte) direkt aus den Bytes lesen, ohne Slices
+                syn_payload = seg.payload
+                host = f"{syn_payload[0]}.{syn_payload[1]}.{syn_payload[2]}.{syn_payload[3]}"
+                port = (syn_payload[4] << 8) | syn_payload[5]
                 self.tcb.socket_id = seg.socket_id
                 self.tcb.remote_ip = host
                 self.tcb.remote_port = port
-                _log(f"STATE: LISTEN, SYN received: remote ip={host}, remote port={port}, socket_id={seg.socket_id}")
+                if _DBG:
+                    _log(f"STATE: LISTEN, SYN received: remote ip={host}, remote port={port}, socket_id={seg.socket_id}")
                 self._data_link.register_syn_sent_socket(self)
                 _log("Socket registered as SYN_RCVD with data link", LOGLEVEL_DEBUG)
 
@@ -784,23 +858,26 @@ class LoRaTCP:
 
             # first check the ACK bit
             if seg.ack_flag:
-                _log(f"Checking ACK in SYN_SENT: seg.ack={seg.ack}, iss={tcb.iss}, snd_nxt={tcb.snd_nxt}",
-                     LOGLEVEL_DEBUG)
+                if _DBG:
+                    _log(f"Checking ACK in SYN_SENT: seg.ack={seg.ack}, iss={tcb.iss}, snd_nxt={tcb.snd_nxt}",
+                         LOGLEVEL_DEBUG)
                 # If SEG.ACK =< ISS, or SEG.ACK > SND.NXT,
-                if Seq(seg.ack) <= Seq(tcb.iss) or Seq(seg.ack) > Seq(tcb.snd_nxt):
+                if seq_le(seg.ack, tcb.iss) or seq_gt(seg.ack, tcb.snd_nxt):
                     _log(f"ACK out of range: {seg.ack} not in ({tcb.iss}, {tcb.snd_nxt}]", LOGLEVEL_WARNING)
                     # send a reset (unless the RST bit is set, if so drop the segment and return)
                     # <SEQ=SEG.ACK><CTL=RST>
                     if not seg.rst_flag:
                         new_seg = LoRaTCPSegment(seg.socket_id, seq=seg.ack, rst_flag=True)
-                        _log(f"Sending RST for unacceptable ACK: seq={seg.ack}", LOGLEVEL_DEBUG)
+                        if _DBG:
+                            _log(f"Sending RST for unacceptable ACK: seq={seg.ack}", LOGLEVEL_DEBUG)
                         self.send_segment(new_seg)
                     # and discard the segment. Return.
                     # Quelle:  RFC 793, p. 66
                     return
                 # If SND.UNA =< SEG.ACK =< SND.NXT then the ACK is acceptable.
                 ack_acceptable = self.tcb.is_ack_acceptable(seg.ack)
-                _log(f"ACK acceptability check: {ack_acceptable}", LOGLEVEL_DEBUG)
+                if _DBG:
+                    _log(f"ACK acceptability check: {ack_acceptable}", LOGLEVEL_DEBUG)
 
             # second check the RST bit
             if seg.rst_flag:
@@ -823,21 +900,24 @@ class LoRaTCP:
             if seg.syn_flag:
                 _log("Processing SYN in SYN_SENT state", LOGLEVEL_INFO)
                 # RCV.NXT is set to SEG.SEQ+1, IRS is set to SEG.SEQ.
-                self.tcb.rcv_nxt = seg.seq + 1
+                self.tcb.rcv_nxt = seq_add(seg.seq, 1)
                 self.tcb.irs = seg.seq
-                _log(f"Updated receive variables: rcv_nxt={self.tcb.rcv_nxt}, irs={self.tcb.irs}", LOGLEVEL_DEBUG)
+                if _DBG:
+                    _log(f"Updated receive variables: rcv_nxt={self.tcb.rcv_nxt}, irs={self.tcb.irs}", LOGLEVEL_DEBUG)
                 if seg.ack_flag:
                     # SND.UNA should be advanced to equal SEG.ACK (if there is an ACK),
                     self.tcb.snd_una = seg.ack
-                    _log(f"Updated snd_una to {self.tcb.snd_una}", LOGLEVEL_DEBUG)
+                    if _DBG:
+                        _log(f"Updated snd_una to {self.tcb.snd_una}", LOGLEVEL_DEBUG)
                     # and any segments on the retransmission queue which are thereby acknowledged should be removed.
                     removed_count = len(self.tcb.retransmission_queue)
                     self.tcb.remove_acknowledged_segments_from_retransmission_queue()
                     removed_count -= len(self.tcb.retransmission_queue)
                     if removed_count > 0:
-                        _log(f"Removed {removed_count} acknowledged segments from retransmission queue", LOGLEVEL_DEBUG)
+                        if _DBG:
+                            _log(f"Removed {removed_count} acknowledged segments from retransmission queue", LOGLEVEL_DEBUG)
 
-                if self.tcb.iss < self.tcb.snd_una:
+                if seq_lt(self.tcb.iss, self.tcb.snd_una):
                     # If SND.UNA > ISS (our SYN has been ACKed),
                     # change the connection state to ESTABLISHED, form an ACK segment and send it
                     # <SEQ=SND.NXT><ACK=RCV.NXT><CTL=ACK>
@@ -845,12 +925,11 @@ class LoRaTCP:
                     _log("SYN ACKed, transitioning to ESTABLISHED state", LOGLEVEL_INFO)
                     self.tcb.state = TCB.STATE_ESTAB
                     with self.tcb.send_buffer_lock:
-                        payload_len = min(len(self.tcb.send_buffer), self.tcb.snd_wnd)
-                        payload = self.tcb.send_buffer[:payload_len]
-                        self.tcb.send_buffer = self.tcb.send_buffer[payload_len:]
-                        _log(
-                            f"Sending ACK with payload: payload_len={payload_len}, remaining_buffer={len(self.tcb.send_buffer)}",
-                            LOGLEVEL_DEBUG)
+                        payload = self.tcb.take_send_data(self.tcb.snd_wnd)
+                        if _DBG:
+                            _log(
+                                f"Sending ACK with payload: payload_len={len(payload)}, remaining_buffer={self.tcb.send_buffer_len}",
+                                LOGLEVEL_DEBUG)
                         new_seg = LoRaTCPSegment(seg.socket_id, seq=self.tcb.snd_nxt, ack=self.tcb.rcv_nxt,
                                                  ack_flag=True, payload=payload)
                         self.send_segment(new_seg)
@@ -861,20 +940,21 @@ class LoRaTCP:
                     # weil die Basisstation immer mit einem SYN, ACK antworten wird.
                     _log("Entering SYN_RCVD state (unusual case)", LOGLEVEL_WARNING)
                     self.tcb.state = TCB.STATE_SYN_RCVD
-                    new_seg = LoRaTCPSegment(seg.socket_id, seq=Seq(self.tcb.iss), ack=self.tcb.rcv_nxt,
+                    new_seg = LoRaTCPSegment(seg.socket_id, seq=self.tcb.iss, ack=self.tcb.rcv_nxt,
                                              ack_flag=True)
                     self.send_segment(new_seg)
             return
 
         else:  # Otherwise,
-            _log(f"Processing segment in state {TCB_STATES[state]}", LOGLEVEL_DEBUG)
+            if _DBG:
+                _log(f"Processing segment in state {TCB_STATES[state]}", LOGLEVEL_DEBUG)
             # Track if FIN was acknowledged in this segment for proper state transitions
             fin_was_acked = False
             # first check sequence number
-            if state in [TCB.STATE_SYN_RCVD, TCB.STATE_ESTAB,
+            if state in (TCB.STATE_SYN_RCVD, TCB.STATE_ESTAB,
                          TCB.STATE_FIN_WAIT_1, TCB.STATE_FIN_WAIT_2,
                          TCB.STATE_CLOSE_WAIT, TCB.STATE_CLOSING,
-                         TCB.STATE_LAST_ACK, TCB.STATE_TIME_WAIT]:
+                         TCB.STATE_LAST_ACK, TCB.STATE_TIME_WAIT):
                 # Segments are processed in sequence.
                 # Initial tests on arrival are used to discard old duplicates,
                 # but further processing is done in SEG.SEQ order.
@@ -883,9 +963,10 @@ class LoRaTCP:
 
                 # There are four cases for the acceptability test for an incoming segment:
                 acceptable = self.check_if_segment_is_in_receive_window(seg)
-                _log(
-                    f"Sequence number acceptability check: {acceptable} (seq={seg.seq}, rcv_nxt={self.tcb.rcv_nxt}, rcv_wnd={self.tcb.rcv_wnd})",
-                    LOGLEVEL_DEBUG)
+                if _DBG:
+                    _log(
+                        f"Sequence number acceptability check: {acceptable} (seq={seg.seq}, rcv_nxt={self.tcb.rcv_nxt}, rcv_wnd={self.tcb.rcv_wnd})",
+                        LOGLEVEL_DEBUG)
 
                 # If the RCV.WND is zero, no segments will be acceptable,
                 # but special allowance should be made to accept valid ACKs, URGs and RSTs.
@@ -895,10 +976,12 @@ class LoRaTCP:
                 if not acceptable:
                     _log("Segment not acceptable, checking for special cases", LOGLEVEL_DEBUG)
                     if self.tcb.is_ack_acceptable(seg.ack):
-                        _log(f"ACK is acceptable, updating snd_una: {self.tcb.snd_una} -> {seg.ack}", LOGLEVEL_DEBUG)
+                        if _DBG:
+                            _log(f"ACK is acceptable, updating snd_una: {self.tcb.snd_una} -> {seg.ack}", LOGLEVEL_DEBUG)
                         self.tcb.snd_una = seg.ack
                         self.tcb.remove_acknowledged_segments_from_retransmission_queue()
-                    if seg.rst_flag and self.tcb.rcv_nxt <= seg.seq < (self.tcb.rcv_nxt + self.tcb.rcv_wnd):
+                    if seg.rst_flag and seq_le(self.tcb.rcv_nxt, seg.seq) and \
+                            seq_lt(seg.seq, seq_add(self.tcb.rcv_nxt, self.tcb.rcv_wnd)):
                         _log("RST in acceptable range, closing connection", LOGLEVEL_WARNING)
                         self.tcb.state = TCB.STATE_CLOSED
                         self._internal_close_call()
@@ -938,7 +1021,7 @@ class LoRaTCP:
                         return
                     # In either case, all segments on the retransmission queue should be removed.
                     # And in the active OPEN case, enter the CLOSED state and delete the TCB, and return.
-            elif tcb.state in [TCB.STATE_ESTAB, TCB.STATE_FIN_WAIT_1, TCB.STATE_FIN_WAIT_2, TCB.STATE_CLOSE_WAIT]:
+            elif tcb.state in (TCB.STATE_ESTAB, TCB.STATE_FIN_WAIT_1, TCB.STATE_FIN_WAIT_2, TCB.STATE_CLOSE_WAIT):
                 # If the RST bit is set then, any outstanding RECEIVEs and SEND should receive "reset" responses.
                 # All segment queues should be flushed.
                 # Users should also receive an unsolicited general "connection reset" signal.
@@ -948,10 +1031,11 @@ class LoRaTCP:
                     tcb.state = TCB.STATE_CLOSED
                     self._internal_close_call()
                     return
-            elif tcb.state in [TCB.STATE_CLOSING, TCB.STATE_LAST_ACK, TCB.STATE_TIME_WAIT]:
+            elif tcb.state in (TCB.STATE_CLOSING, TCB.STATE_LAST_ACK, TCB.STATE_TIME_WAIT):
                 # If the RST bit is set then, enter the CLOSED state, delete the TCB, and return.
                 if seg.rst_flag:
-                    _log(f"RST received in closing state {TCB_STATES[self.tcb.state]}", LOGLEVEL_INFO)
+                    if _INFO:
+                        _log(f"RST received in closing state {TCB_STATES[self.tcb.state]}", LOGLEVEL_INFO)
                     tcb.state = TCB.STATE_CLOSED
                     self._internal_close_call()
                     return
@@ -959,10 +1043,10 @@ class LoRaTCP:
             # ignoring this
 
             # fourth, check the SYN bit,
-            if tcb.state in [TCB.STATE_SYN_RCVD, TCB.STATE_ESTAB,
+            if tcb.state in (TCB.STATE_SYN_RCVD, TCB.STATE_ESTAB,
                              TCB.STATE_FIN_WAIT_1, TCB.STATE_FIN_WAIT_2,
                              TCB.STATE_CLOSE_WAIT, TCB.STATE_CLOSING,
-                             TCB.STATE_LAST_ACK, TCB.STATE_TIME_WAIT]:
+                             TCB.STATE_LAST_ACK, TCB.STATE_TIME_WAIT):
                 # If the SYN is in the window it is an error, send a reset,
                 # any outstanding RECEIVEs and SEND should receive "reset" responses,
                 # all segment queues should be flushed, the user should also receive
@@ -985,35 +1069,39 @@ class LoRaTCP:
             elif tcb.state == TCB.STATE_SYN_RCVD:
                 _log("Processing ACK in SYN_RCVD state", LOGLEVEL_DEBUG)
                 # If SND.UNA =< SEG.ACK =< SND.NXT then enter ESTABLISHED state and continue processing.
-                if tcb.snd_una <= seg.ack <= tcb.snd_nxt:
+                if seq_le(tcb.snd_una, seg.ack) and seq_le(seg.ack, tcb.snd_nxt):
                     _log("ACK acceptable, transitioning to ESTABLISHED state", LOGLEVEL_INFO)
                     tcb.state = TCB.STATE_ESTAB
                     if not tcb.is_ack_acceptable(seg.ack):
                         _log("ACK not acceptable despite being in range, sending RST", LOGLEVEL_WARNING)
                         new_seg = LoRaTCPSegment(seg.socket_id, seq=seg.ack, rst_flag=True)
                         self.send_segment(new_seg)
-            elif tcb.state in [TCB.STATE_ESTAB, TCB.STATE_CLOSE_WAIT]:
-                _log(f"Processing ACK in {TCB_STATES[self.tcb.state]} state", LOGLEVEL_DEBUG)
+            elif tcb.state in (TCB.STATE_ESTAB, TCB.STATE_CLOSE_WAIT):
+                if _DBG:
+                    _log(f"Processing ACK in {TCB_STATES[self.tcb.state]} state", LOGLEVEL_DEBUG)
                 # If SND.UNA < SEG.ACK =< SND.NXT then, set SND.UNA <- SEG.ACK.
-                if tcb.snd_una <= seg.ack <= tcb.snd_nxt:
+                if seq_le(tcb.snd_una, seg.ack) and seq_le(seg.ack, tcb.snd_nxt):
                     # Any segments on the retransmission queue which are thereby entirely acknowledged are removed.
                     # Users should receive positive acknowledgments for buffers which have been SENT
                     # and fully acknowledged (i.e., SEND buffer should be returned with "ok" response).
                     # If the ACK is a duplicate (SEG.ACK < SND.UNA), it can be ignored.
-                    if seg.ack < tcb.snd_una:
-                        _log(f"Ignored duplicate ACK SEG.ACK({seg.ack}) < SND.UNA({tcb.snd_una})", LOGLEVEL_DEBUG)
+                    if seq_lt(seg.ack, tcb.snd_una):
+                        if _DBG:
+                            _log(f"Ignored duplicate ACK SEG.ACK({seg.ack}) < SND.UNA({tcb.snd_una})", LOGLEVEL_DEBUG)
                     old_snd_una = tcb.snd_una
                     tcb.snd_una = seg.ack
-                    _log(f"Updated snd_una: {old_snd_una} -> {tcb.snd_una}", LOGLEVEL_DEBUG)
+                    if _DBG:
+                        _log(f"Updated snd_una: {old_snd_una} -> {tcb.snd_una}", LOGLEVEL_DEBUG)
                     removed_count = len(tcb.retransmission_queue)
                     tcb.remove_acknowledged_segments_from_retransmission_queue()
                     removed_count -= len(tcb.retransmission_queue)
                     if removed_count > 0:
-                        _log(f"Removed {removed_count} acknowledged segments from retransmission queue", LOGLEVEL_DEBUG)
+                        if _DBG:
+                            _log(f"Removed {removed_count} acknowledged segments from retransmission queue", LOGLEVEL_DEBUG)
 
                 # If the ACK acks something not yet sent (SEG.ACK > SND.NXT) then send an ACK,
                 # drop the segment, and return.
-                if seg.ack > tcb.snd_nxt:
+                if seq_gt(seg.ack, tcb.snd_nxt):
                     _log(f"ACK for unsent data: {seg.ack} > {tcb.snd_nxt}, dropping", LOGLEVEL_WARNING)
                     return
                 #
@@ -1023,19 +1111,21 @@ class LoRaTCP:
                 #   Note that SND.WND is an offset from SND.UNA, that SND.WL1 records the sequence number
                 #   of the last segment used to update SND.WND, and that SND.WL2 records the acknowledgment number
                 #   of the last segment used to update SND.WND. The check here prevents using old segments to update the window.
-            elif tcb.state in [TCB.STATE_FIN_WAIT_1, TCB.STATE_FIN_WAIT_2]:
-                _log(f"Processing ACK in {TCB_STATES[self.tcb.state]} state", LOGLEVEL_DEBUG)
+            elif tcb.state in (TCB.STATE_FIN_WAIT_1, TCB.STATE_FIN_WAIT_2):
+                if _DBG:
+                    _log(f"Processing ACK in {TCB_STATES[self.tcb.state]} state", LOGLEVEL_DEBUG)
 
                 # In addition to the processing for the ESTABLISHED state,
                 # ######## ESTAB Processing #########
                 # If SND.UNA < SEG.ACK =< SND.NXT then, set SND.UNA <- SEG.ACK.
-                if tcb.snd_una <= seg.ack <= tcb.snd_nxt:
+                if seq_le(tcb.snd_una, seg.ack) and seq_le(seg.ack, tcb.snd_nxt):
                     # Any segments on the retransmission queue which are thereby entirely acknowledged are removed.
                     # Users should receive positive acknowledgments for buffers which have been SENT
                     # and fully acknowledged (i.e., SEND buffer should be returned with "ok" response).
                     old_snd_una = tcb.snd_una
                     tcb.snd_una = seg.ack
-                    _log(f"Updated snd_una: {old_snd_una} -> {tcb.snd_una}", LOGLEVEL_DEBUG)
+                    if _DBG:
+                        _log(f"Updated snd_una: {old_snd_una} -> {tcb.snd_una}", LOGLEVEL_DEBUG)
                     tcb.remove_acknowledged_segments_from_retransmission_queue()
 
                     # Check if this ACK acknowledges our FIN (only for FIN_WAIT_1)
@@ -1045,11 +1135,11 @@ class LoRaTCP:
                         tcb.state = TCB.STATE_FIN_WAIT_2
 
                 # If the ACK is a duplicate (SEG.ACK < SND.UNA), it can be ignored.
-                # if seg.ack < tcb.snd_una:
+                # if seq_lt(seg.ack, tcb.snd_una):
 
                 # If the ACK acks something not yet sent (SEG.ACK > SND.NXT) then send an ACK,
                 # drop the segment, and return.
-                if seg.ack > tcb.snd_nxt:
+                if seq_gt(seg.ack, tcb.snd_nxt):
                     _log(f"ACK for unsent data in FIN_WAIT: {seg.ack} > {tcb.snd_nxt}", LOGLEVEL_WARNING)
                     return
                 # ######## ESTAB Processing End #########
@@ -1057,18 +1147,18 @@ class LoRaTCP:
                     # In addition to the processing for the ESTABLISHED state,
                     # ######## ESTAB Processing #########
                     # If SND.UNA < SEG.ACK =< SND.NXT then, set SND.UNA <- SEG.ACK.
-                    if tcb.snd_una <= seg.ack <= tcb.snd_nxt:
+                    if seq_le(tcb.snd_una, seg.ack) and seq_le(seg.ack, tcb.snd_nxt):
                         # Any segments on the retransmission queue which are thereby entirely acknowledged are removed.
                         # Users should receive positive acknowledgments for buffers which have been SENT
                         # and fully acknowledged (i.e., SEND buffer should be returned with "ok" response).
                         tcb.snd_una = seg.ack
                         tcb.remove_acknowledged_segments_from_retransmission_queue()
                     # If the ACK is a duplicate (SEG.ACK < SND.UNA), it can be ignored.
-                    # if seg.ack < tcb.snd_una:
+                    # if seq_lt(seg.ack, tcb.snd_una):
 
                     # If the ACK acks something not yet sent (SEG.ACK > SND.NXT) then send an ACK,
                     # drop the segment, and return.
-                    if seg.ack > tcb.snd_nxt:
+                    if seq_gt(seg.ack, tcb.snd_nxt):
                         return
                     # ######## ESTAB Processing End #########
                     # if the retransmission queue is empty,
@@ -1079,18 +1169,18 @@ class LoRaTCP:
                 # In addition to the processing for the ESTABLISHED state,
                 # ######## ESTAB Processing #########
                 # If SND.UNA < SEG.ACK =< SND.NXT then, set SND.UNA <- SEG.ACK.
-                if tcb.snd_una <= seg.ack <= tcb.snd_nxt:
+                if seq_le(tcb.snd_una, seg.ack) and seq_le(seg.ack, tcb.snd_nxt):
                     # Any segments on the retransmission queue which are thereby entirely acknowledged are removed.
                     # Users should receive positive acknowledgments for buffers which have been SENT
                     # and fully acknowledged (i.e., SEND buffer should be returned with "ok" response).
                     tcb.snd_una = seg.ack
                     tcb.remove_acknowledged_segments_from_retransmission_queue()
                 # If the ACK is a duplicate (SEG.ACK < SND.UNA), it can be ignored.
-                # if seg.ack < tcb.snd_una:
+                # if seq_lt(seg.ack, tcb.snd_una):
 
                 # If the ACK acks something not yet sent (SEG.ACK > SND.NXT) then send an ACK,
                 # drop the segment, and return.
-                if seg.ack > tcb.snd_nxt:
+                if seq_gt(seg.ack, tcb.snd_nxt):
                     return
                 # ######## ESTAB Processing End #########
                 # if the ACK acknowledges our FIN then enter the TIME-WAIT state, otherwise ignore the segment.
@@ -1102,7 +1192,8 @@ class LoRaTCP:
                 # The only thing that can arrive in this state is an acknowledgment of our FIN.
                 # Update snd_una first, then check if our FIN is now acknowledged
                 if tcb.is_ack_acceptable(seg.ack):
-                    _log(f"Updated snd_una: {tcb.snd_una} -> {seg.ack}", LOGLEVEL_DEBUG)
+                    if _DBG:
+                        _log(f"Updated snd_una: {tcb.snd_una} -> {seg.ack}", LOGLEVEL_DEBUG)
                     tcb.snd_una = seg.ack
                     tcb.remove_acknowledged_segments_from_retransmission_queue()
 
@@ -1124,16 +1215,18 @@ class LoRaTCP:
             # ingoring this
 
             # seventh, process the segment text,
-            if tcb.state in [TCB.STATE_ESTAB, TCB.STATE_FIN_WAIT_1, TCB.STATE_FIN_WAIT_2] and len(seg.payload) > 0:
-                _log(
-                    f"Processing segment payload in {TCB_STATES[self.tcb.state]} state: payload_len={len(seg.payload)}",
-                    LOGLEVEL_DEBUG)
+            if tcb.state in (TCB.STATE_ESTAB, TCB.STATE_FIN_WAIT_1, TCB.STATE_FIN_WAIT_2) and len(seg.payload) > 0:
+                if _DBG:
+                    _log(
+                        f"Processing segment payload in {TCB_STATES[self.tcb.state]} state: payload_len={len(seg.payload)}",
+                        LOGLEVEL_DEBUG)
                 # Once in the ESTABLISHED state, it is possible to deliver segment text to user RECEIVE buffers.
                 # Text from segments can be moved into buffers until either the buffer is full or the segment is empty.
                 # If the segment empties and carries an PUSH flag, then the user is informed, when the buffer is returned,
                 # that a PUSH has been received.
 
-                _log(f"Adding payload to receive buffer: seq={seg.seq}, len={len(seg.payload)}", LOGLEVEL_DEBUG)
+                if _DBG:
+                    _log(f"Adding payload to receive buffer: seq={seg.seq}, len={len(seg.payload)}", LOGLEVEL_DEBUG)
                 tcb.receive_buffer[seg.seq] = seg.payload
 
                 # When the TCP takes responsibility for delivering the data to the user
@@ -1153,21 +1246,21 @@ class LoRaTCP:
                 old_rcv_wnd = tcb.rcv_wnd
                 tcb.rcv_wnd = LoRaTCP_MAX_PAYLOAD_SIZE - len(tcb.receive_buffer)
                 if old_rcv_wnd != tcb.rcv_wnd:
-                    _log(f"Updated receive window: {old_rcv_wnd} -> {tcb.rcv_wnd}", LOGLEVEL_DEBUG)
+                    if _DBG:
+                        _log(f"Updated receive window: {old_rcv_wnd} -> {tcb.rcv_wnd}", LOGLEVEL_DEBUG)
 
                 # Send an acknowledgment of the form:  <SEQ=SND.NXT><ACK=RCV.NXT><CTL=ACK>
                 # This acknowledgment should be piggybacked on a segment being transmitted if possible without incurring undue delay.
                 with self.tcb.send_buffer_lock:
-                    payload_len = min(len(self.tcb.send_buffer), tcb.snd_wnd)
                     # TODO Darf nur versendet werden wenn Daten empfangen wurden
-                    payload = self.tcb.send_buffer[:payload_len]
-                    self.tcb.send_buffer = self.tcb.send_buffer[payload_len:]
-                    _log(f"Sending ACK with piggyback data: ack={tcb.rcv_nxt}, payload_len={payload_len}",
-                         LOGLEVEL_DEBUG)
+                    payload = self.tcb.take_send_data(tcb.snd_wnd)
+                    if _DBG:
+                        _log(f"Sending ACK with piggyback data: ack={tcb.rcv_nxt}, payload_len={len(payload)}",
+                             LOGLEVEL_DEBUG)
                     new_seg = LoRaTCPSegment(seg.socket_id, seq=tcb.snd_nxt, ack=tcb.rcv_nxt, ack_flag=True,
                                              payload=payload)
                     self.send_segment(new_seg)
-            elif tcb.state in [TCB.STATE_CLOSE_WAIT, TCB.STATE_CLOSING, TCB.STATE_LAST_ACK, TCB.STATE_TIME_WAIT]:
+            elif tcb.state in (TCB.STATE_CLOSE_WAIT, TCB.STATE_CLOSING, TCB.STATE_LAST_ACK, TCB.STATE_TIME_WAIT):
                 # This should not occur, since a FIN has been received from the remote side. Ignore the segment text.
                 if len(seg.payload) > 0:
                     _log(
@@ -1177,33 +1270,39 @@ class LoRaTCP:
 
             # eighth, check the FIN bit,
             if seg.fin_flag:
-                _log(f"Processing FIN in state {TCB_STATES[self.tcb.state]}", LOGLEVEL_INFO)
-                if tcb.state in [TCB.STATE_CLOSED, TCB.STATE_LISTEN, TCB.STATE_SYN_SENT]:
+                if _INFO:
+                    _log(f"Processing FIN in state {TCB_STATES[self.tcb.state]}", LOGLEVEL_INFO)
+                if tcb.state in (TCB.STATE_CLOSED, TCB.STATE_LISTEN, TCB.STATE_SYN_SENT):
                     # Do not process the FIN if the state is CLOSED, LISTEN or SYN-SENT
                     # since the SEG.SEQ cannot be validated; drop the segment and return.
-                    _log(f"Ignoring FIN in state {TCB_STATES[self.tcb.state]} (cannot validate sequence)",
-                         LOGLEVEL_DEBUG)
+                    if _DBG:
+                        _log(f"Ignoring FIN in state {TCB_STATES[self.tcb.state]} (cannot validate sequence)",
+                             LOGLEVEL_DEBUG)
                     return
                 # If the FIN bit is set, signal the user "connection closing" and return any
                 # pending RECEIVEs with same message, advance RCV.NXT over the FIN,
                 # and send an acknowledgment for the FIN. Note that FIN implies PUSH for any
                 # segment text not yet delivered to the user.
                 if len(seg.payload) > 0:
-                    _log(f"FIN with payload: adding {len(seg.payload)} bytes to receive buffer", LOGLEVEL_DEBUG)
-                    tcb.receive_buffer[Seq(seg.seq)] = seg.payload
+                    if _DBG:
+                        _log(f"FIN with payload: adding {len(seg.payload)} bytes to receive buffer", LOGLEVEL_DEBUG)
+                    tcb.receive_buffer[seg.seq] = seg.payload
                     # Advance RCV.NXT over the payload
-                    tcb.rcv_nxt = tcb.rcv_nxt + len(seg.payload)
+                    tcb.rcv_nxt = seq_add(tcb.rcv_nxt, len(seg.payload))
 
                 # Advance RCV.NXT over the FIN (FIN occupies 1 sequence number)
                 old_rcv_nxt = tcb.rcv_nxt
-                tcb.rcv_nxt = tcb.rcv_nxt + 1
-                _log(f"Advanced RCV.NXT over FIN: {old_rcv_nxt} -> {tcb.rcv_nxt}", LOGLEVEL_DEBUG)
+                tcb.rcv_nxt = seq_add(tcb.rcv_nxt, 1)
+                if _DBG:
+                    _log(f"Advanced RCV.NXT over FIN: {old_rcv_nxt} -> {tcb.rcv_nxt}", LOGLEVEL_DEBUG)
                 # Send an acknowledgment for the FIN
-                _log(f"Sending ACK for FIN: ack={tcb.rcv_nxt}", LOGLEVEL_DEBUG)
+                if _DBG:
+                    _log(f"Sending ACK for FIN: ack={tcb.rcv_nxt}", LOGLEVEL_DEBUG)
                 new_seg = LoRaTCPSegment(seg.socket_id, seq=tcb.snd_nxt, ack=tcb.rcv_nxt, ack_flag=True)
                 self.send_segment(new_seg)
-                if tcb.state in [TCB.STATE_SYN_RCVD, TCB.STATE_ESTAB]:
-                    _log(f"FIN received in {TCB_STATES[self.tcb.state]}, transitioning to CLOSE_WAIT", LOGLEVEL_INFO)
+                if tcb.state in (TCB.STATE_SYN_RCVD, TCB.STATE_ESTAB):
+                    if _INFO:
+                        _log(f"FIN received in {TCB_STATES[self.tcb.state]}, transitioning to CLOSE_WAIT", LOGLEVEL_INFO)
                     tcb.state = TCB.STATE_CLOSE_WAIT
                 elif tcb.state == TCB.STATE_FIN_WAIT_1:
                     # If our FIN has been ACKed (perhaps in this segment), then enter TIME-WAIT,
@@ -1225,8 +1324,9 @@ class LoRaTCP:
                     tcb.state = TCB.STATE_TIME_WAIT
                     tcb.cancel_all_timers()
                     tcb.start_time_wait_timer()
-                elif tcb.state in [TCB.STATE_CLOSE_WAIT, TCB.STATE_CLOSING, TCB.STATE_LAST_ACK]:
-                    _log(f"FIN received in {TCB_STATES[self.tcb.state]}, no state change", LOGLEVEL_DEBUG)
+                elif tcb.state in (TCB.STATE_CLOSE_WAIT, TCB.STATE_CLOSING, TCB.STATE_LAST_ACK):
+                    if _DBG:
+                        _log(f"FIN received in {TCB_STATES[self.tcb.state]}, no state change", LOGLEVEL_DEBUG)
                     pass
                 elif tcb.state == TCB.STATE_TIME_WAIT:
                     _log("FIN received in TIME_WAIT, restarting time-wait timer", LOGLEVEL_DEBUG)
@@ -1246,35 +1346,41 @@ class LoRaTCP:
             is_retransmission: True wenn es sich um eine Wiederholung handelt,
                              False für Erstübertragung (Standard)
         """
-        _log(
-            f"Sending segment: socket_id={seg.socket_id}, seq={seg.seq}, ack={seg.ack}, flags=SYN:{seg.syn_flag},ACK:{seg.ack_flag},FIN:{seg.fin_flag},RST:{seg.rst_flag}, payload_len={len(seg.payload)}",
-            LOGLEVEL_INFO)
+        if _INFO:
+            _log(
+                f"Sending segment: socket_id={seg.socket_id}, seq={seg.seq}, ack={seg.ack}, flags=SYN:{seg.syn_flag},ACK:{seg.ack_flag},FIN:{seg.fin_flag},RST:{seg.rst_flag}, payload_len={len(seg.payload)}",
+                LOGLEVEL_INFO)
 
         segment_bytes = seg.to_bytes()
-        _log(f"Segment serialized to {len(segment_bytes)} bytes", LOGLEVEL_DEBUG)
+        if _DBG:
+            _log(f"Segment serialized to {len(segment_bytes)} bytes", LOGLEVEL_DEBUG)
         self._data_link.add_to_send_queue(segment_bytes)
 
         # Zur Retransmission Queue hinzufügen (nur bei Erstübertragung)
         if not is_retransmission and (len(seg.payload) > 0 or seg.syn_flag or seg.fin_flag):
-            _log(
-                f"Adding segment to retransmission queue (payload_len={len(seg.payload)}, SYN={seg.syn_flag}, FIN={seg.fin_flag})",
-                LOGLEVEL_DEBUG)
+            if _DBG:
+                _log(
+                    f"Adding segment to retransmission queue (payload_len={len(seg.payload)}, SYN={seg.syn_flag}, FIN={seg.fin_flag})",
+                    LOGLEVEL_DEBUG)
             self.tcb.retransmission_queue.append(seg)
             self.tcb.start_retransmission_timeout_timer()
-            _log(f"Retransmission queue length: {len(self.tcb.retransmission_queue)}", LOGLEVEL_DEBUG)
+            if _DBG:
+                _log(f"Retransmission queue length: {len(self.tcb.retransmission_queue)}", LOGLEVEL_DEBUG)
 
         # SND.NXT aktualisieren (nur bei Erstübertragung)
         if not is_retransmission:
             old_snd_nxt = self.tcb.snd_nxt
             if len(seg.payload) > 0:
-                self.tcb.snd_nxt = self.tcb.snd_nxt + len(seg.payload)
+                self.tcb.snd_nxt = seq_add(self.tcb.snd_nxt, len(seg.payload))
             if seg.fin_flag or seg.syn_flag:
-                self.tcb.snd_nxt = self.tcb.snd_nxt + 1
+                self.tcb.snd_nxt = seq_add(self.tcb.snd_nxt, 1)
                 if seg.fin_flag:
                     self.tcb.fin_seq = seg.seq
-                    _log(f"FIN sequence number recorded: {self.tcb.fin_seq}", LOGLEVEL_DEBUG)
+                    if _DBG:
+                        _log(f"FIN sequence number recorded: {self.tcb.fin_seq}", LOGLEVEL_DEBUG)
             if old_snd_nxt != self.tcb.snd_nxt:
-                _log(f"Updated SND.NXT: {old_snd_nxt} -> {self.tcb.snd_nxt}", LOGLEVEL_DEBUG)
+                if _DBG:
+                    _log(f"Updated SND.NXT: {old_snd_nxt} -> {self.tcb.snd_nxt}", LOGLEVEL_DEBUG)
 
     def is_fin_acknowledged(self) -> bool:
         """
@@ -1288,9 +1394,10 @@ class LoRaTCP:
             bool: True wenn FIN bestätigt wurde, False andernfalls
         """
         result = (self.tcb.fin_seq is not None and
-                  self.tcb.snd_una > self.tcb.fin_seq)
-        _log(f"FIN acknowledgment check: fin_seq={self.tcb.fin_seq}, snd_una={self.tcb.snd_una}, result={result}",
-             LOGLEVEL_DEBUG)
+                  seq_gt(self.tcb.snd_una, self.tcb.fin_seq))
+        if _DBG:
+            _log(f"FIN acknowledgment check: fin_seq={self.tcb.fin_seq}, snd_una={self.tcb.snd_una}, result={result}",
+                 LOGLEVEL_DEBUG)
         return result
 
     def is_syn_in_window(self, seg: LoRaTCPSegment) -> bool:
@@ -1299,7 +1406,7 @@ class LoRaTCP:
 
         Ein SYN-Segment im Empfangsfenster während einer etablierten
         Verbindung ist ein Protokollfehler und führt zum Connection Reset.
-        Verwendet Sequenznummer-Arithmetik mit Wraparound-Behandlung durch Verwendung der Seq-Klasse.
+        Verwendet Sequenznummer-Arithmetik mit Wraparound-Behandlung (seq_le/seq_lt/seq_add).
 
         Args:
             seg: Das zu prüfende TCP-Segment
@@ -1314,10 +1421,11 @@ class LoRaTCP:
         rcv_wnd = self.tcb.rcv_wnd
 
         # Sequence Number Arithmetic mit Wrap-around
-        result = (Seq(rcv_nxt) <= Seq(seg.seq) <
-                  Seq(rcv_nxt) + Seq(rcv_wnd))
-        _log(f"SYN in window check: seq={seg.seq}, rcv_nxt={rcv_nxt}, rcv_wnd={rcv_wnd}, result={result}",
-             LOGLEVEL_DEBUG)
+        result = (seq_le(rcv_nxt, seg.seq) and
+                  seq_lt(seg.seq, seq_add(rcv_nxt, rcv_wnd)))
+        if _DBG:
+            _log(f"SYN in window check: seq={seg.seq}, rcv_nxt={rcv_nxt}, rcv_wnd={rcv_wnd}, result={result}",
+                 LOGLEVEL_DEBUG)
         return result
 
     def check_if_segment_is_in_receive_window(self, seg: LoRaTCPSegment) -> bool:
@@ -1340,35 +1448,41 @@ class LoRaTCP:
         - Länge >0, Fenster 0: Nie akzeptabel
         - Länge >0, Fenster >0: Erstes oder letztes Byte im Fenster
         """
-        seg_seq = Seq(seg.seq)
+        seg_seq = seg.seq
         seg_len = len(seg.payload)
-        rcv_nxt = Seq(self.tcb.rcv_nxt)
+        rcv_nxt = self.tcb.rcv_nxt
         rcv_wnd = self.tcb.rcv_wnd
 
-        _log(f"Receive window check: seq={seg_seq}, len={seg_len}, rcv_nxt={rcv_nxt}, rcv_wnd={rcv_wnd}",
-             LOGLEVEL_DEBUG)
+        if _DBG:
+            _log(f"Receive window check: seq={seg_seq}, len={seg_len}, rcv_nxt={rcv_nxt}, rcv_wnd={rcv_wnd}",
+                 LOGLEVEL_DEBUG)
 
         acceptable = False
 
         if seg_len == 0 and rcv_wnd == 0:
             # Zero length segment, zero window: must be exactly RCV.NXT
             acceptable = (seg_seq == rcv_nxt)
-            _log(f"Zero length segment, zero window: {acceptable}", LOGLEVEL_DEBUG)
+            if _DBG:
+                _log(f"Zero length segment, zero window: {acceptable}", LOGLEVEL_DEBUG)
         elif seg_len == 0 and rcv_wnd > 0:
             # Zero length segment, positive window: RCV.NXT <= SEG.SEQ < RCV.NXT+RCV.WND
-            acceptable = rcv_nxt <= seg_seq < (rcv_nxt + rcv_wnd)
-            _log(f"Zero length segment, positive window: {acceptable}", LOGLEVEL_DEBUG)
+            acceptable = seq_le(rcv_nxt, seg_seq) and seq_lt(seg_seq, seq_add(rcv_nxt, rcv_wnd))
+            if _DBG:
+                _log(f"Zero length segment, positive window: {acceptable}", LOGLEVEL_DEBUG)
         elif seg_len > 0 and rcv_wnd == 0:
             # Positive length segment, zero window: never acceptable
             acceptable = False
-            _log(f"Positive length segment, zero window: {acceptable}", LOGLEVEL_DEBUG)
+            if _DBG:
+                _log(f"Positive length segment, zero window: {acceptable}", LOGLEVEL_DEBUG)
         elif seg_len > 0 and rcv_wnd > 0:
             # Positive length segment, positive window: Either first or last byte must be in window
-            last_byte_seq = seg_seq + seg_len - 1
-            acceptable = (rcv_nxt <= seg_seq < (rcv_nxt + rcv_wnd)) or \
-                         (rcv_nxt <= last_byte_seq < (rcv_nxt + rcv_wnd))
-            _log(f"Positive length segment, positive window: last_byte_seq={last_byte_seq}, acceptable={acceptable}",
-                 LOGLEVEL_DEBUG)
+            last_byte_seq = seq_add(seg_seq, seg_len - 1)
+            rcv_end = seq_add(rcv_nxt, rcv_wnd)
+            acceptable = (seq_le(rcv_nxt, seg_seq) and seq_lt(seg_seq, rcv_end)) or \
+                         (seq_le(rcv_nxt, last_byte_seq) and seq_lt(last_byte_seq, rcv_end))
+            if _DBG:
+                _log(f"Positive length segment, positive window: last_byte_seq={last_byte_seq}, acceptable={acceptable}",
+                     LOGLEVEL_DEBUG)
         return acceptable
 
     def _validate_segment(self, seg: LoRaTCPSegment) -> bool:
@@ -1428,32 +1542,36 @@ class LoRaTCP:
         if len(self.tcb.receive_buffer) == 0:
             return
 
-        _log(f"Starting data reassembly: buffer_segments={len(self.tcb.receive_buffer)}, rcv_nxt={self.tcb.rcv_nxt}",
-             LOGLEVEL_DEBUG)
+        if _DBG:
+            _log(f"Starting data reassembly: buffer_segments={len(self.tcb.receive_buffer)}, rcv_nxt={self.tcb.rcv_nxt}",
+                 LOGLEVEL_DEBUG)
 
         with self.tcb.reassembled_data_lock:
             segments_processed = 0
-            initial_data_len = len(self.tcb.reassembled_data)
+            initial_data_len = self.tcb.reassembled_data_len()
 
             while True:
                 # Suche das nächste erwartete Segment
                 expected_seq = self.tcb.rcv_nxt
 
                 if expected_seq not in self.tcb.receive_buffer:
-                    _log(f"No contiguous segment found for seq={expected_seq}", LOGLEVEL_DEBUG)
+                    if _DBG:
+                        _log(f"No contiguous segment found for seq={expected_seq}", LOGLEVEL_DEBUG)
                     break  # Kein zusammenhängendes Segment gefunden
 
                 # Segment aus Buffer holen und verarbeiten
                 segment_data = self.tcb.receive_buffer.pop(expected_seq)
-                _log(f"Processing segment: seq={expected_seq}, len={len(segment_data)}", LOGLEVEL_DEBUG)
+                if _DBG:
+                    _log(f"Processing segment: seq={expected_seq}, len={len(segment_data)}", LOGLEVEL_DEBUG)
 
                 # Zu reassembled_data hinzufügen
-                self.tcb.reassembled_data += segment_data
+                self.tcb.reassembled_data.extend(segment_data)
 
                 # RCV.NXT über die verarbeiteten Daten hinaus bewegen
                 old_rcv_nxt = self.tcb.rcv_nxt
-                self.tcb.rcv_nxt = self.tcb.rcv_nxt + len(segment_data)
-                _log(f"Advanced rcv_nxt: {old_rcv_nxt} -> {self.tcb.rcv_nxt}", LOGLEVEL_DEBUG)
+                self.tcb.rcv_nxt = seq_add(self.tcb.rcv_nxt, len(segment_data))
+                if _DBG:
+                    _log(f"Advanced rcv_nxt: {old_rcv_nxt} -> {self.tcb.rcv_nxt}", LOGLEVEL_DEBUG)
                 segments_processed += 1
 
                 # _log(
@@ -1461,11 +1579,13 @@ class LoRaTCP:
 
             if segments_processed > 0:
                 # IGNORE Receive Window aktualisieren
-                final_data_len = len(self.tcb.reassembled_data)
+                final_data_len = self.tcb.reassembled_data_len()
                 data_added = final_data_len - initial_data_len
-                _log(
-                    f"Reassembled {segments_processed} segments, total reassembled data: {final_data_len} bytes (+{data_added})")
-                _log(f"Remaining segments in receive buffer: {len(self.tcb.receive_buffer)}", LOGLEVEL_DEBUG)
+                if _DBG:
+                    _log(
+                        f"Reassembled {segments_processed} segments, total reassembled data: {final_data_len} bytes (+{data_added})")
+                if _DBG:
+                    _log(f"Remaining segments in receive buffer: {len(self.tcb.receive_buffer)}", LOGLEVEL_DEBUG)
 
     def getpeername(self):
         """
@@ -1478,7 +1598,8 @@ class LoRaTCP:
             tuple: (IP-Adresse, Port) des verbundenen Peers
         """
         peer = (self.tcb.remote_ip, self.tcb.remote_port)
-        _log(f"getpeername called: {peer}", LOGLEVEL_DEBUG)
+        if _DBG:
+            _log(f"getpeername called: {peer}", LOGLEVEL_DEBUG)
         return peer
 
     def pause_timer(self):
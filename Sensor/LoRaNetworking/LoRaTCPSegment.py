@@ -1,157 +1,217 @@
-import struct
-
+import micropython
 from micropython import const
 
-# 2^16 -> 65536, da wir 16-Bit-Sequenznummern verwenden (Wrap-around bei 65536)
-SEQ_MOD = const(65536)
+# 2^16 - 1 -> 0xFFFF, da wir 16-Bit-Sequenznummern verwenden (Wrap-around bei 65536)
+# Maskieren mit & ist auf MicroPython günstiger als % 65536
+SEQ_MASK = const(0xFFFF)
 
-# SEQ_MOD // 2 -> 32768, zur Berechnung der Differenz mit Vorzeichen
-SEQ_HALF = const(32768)
+# 2^15 -> 0x8000, halber Sequenzraum zur Berechnung der Differenz mit Vorzeichen
+SEQ_HALF = const(0x8000)
 
-class Seq(int):
-    def __lt__(self, other) -> bool:
-        """
-        Gibt True zurück, wenn diese Sequenznummer (self) kleiner ist als die andere (other).
+# Länge des Segment-Headers: 1 Byte Socket-ID und Flags, 2 Byte Seq, 2 Byte Ack
+SEGMENT_HEADER_LENGTH = const(5)
 
-        Dies berücksichtigt das Überlaufen des Sequenznummernraums ("Wrap-around").
-        Typisch verwendet, um zu prüfen, ob ein Segment in der Zukunft liegt.
 
-        Beispiel:
-          Seq(10) < Seq(20)  -> True
-          Seq(65530) < Seq(5) -> True (da Wrap-around)
-        """
-        return ((self - other) % SEQ_MOD) > SEQ_HALF
+# Die Kodierung des Headers wird von MicroPython zu Maschinencode übersetzt. Die Bytes werden
+# direkt geschrieben, ohne Formatstring und ohne struct-Aufruf (Dekodierung siehe from_bytes()).
+# (Auf dem Gateway unter CPython sind die Dekoratoren wirkungslos, siehe micropython.py)
 
-    def __le__(self, other) -> bool:
-        """
-        Gibt True zurück, wenn diese Sequenznummer kleiner oder gleich der anderen ist.
+@micropython.native
+def _encode_segment(header_byte, seq, ack, payload):
+    buf = bytearray(SEGMENT_HEADER_LENGTH + len(payload))
+    buf[0] = header_byte
+    buf[1] = seq >> 8
+    buf[2] = seq & 0xFF
+    buf[3] = ack >> 8
+    buf[4] = ack & 0xFF
+    buf[SEGMENT_HEADER_LENGTH:] = payload
+    return buf
 
-        Dies inkludiert den Gleichheitsfall und berücksichtigt ebenfalls den Wrap-around.
 
-        Beispiel:
-          Seq(10) <= Seq(10) -> True
-          Seq(65530) <= Seq(5) -> True
-        """
-        return self == other or self < other
+# Die Flags belegen die unteren 4 Bit des ersten Header-Bytes, es gibt also nur 16 Kombinationen.
+# Index: Flag-Nibble, Wert: (syn_flag, ack_flag, fin_flag, rst_flag) als 0/1
+# (ohne bool(): "if seg.syn_flag:" und das Packen mit << funktionieren mit 0/1 genauso)
+_FLAG_TABLE = tuple((f & 1, (f >> 1) & 1, (f >> 2) & 1, (f >> 3) & 1) for f in range(16))
 
-    def __gt__(self, other) -> bool:
-        """
-        Gibt True zurück, wenn diese Sequenznummer größer ist als die andere.
 
-        Berücksichtigt den Sequenznummern-Überlauf.
+# Text der Flags für __repr__, ebenfalls über das Flag-Nibble indiziert ("NONE", "SYN", "ACK", "SYN|ACK", ...)
+_FLAGS_STR = tuple("|".join(name for bit, name in ((1, "SYN"), (2, "ACK"), (4, "FIN"), (8, "RST")) if f & bit)
+                   or "NONE" for f in range(16))
 
-        Beispiel:
-          Seq(20) > Seq(10) -> True
-          Seq(5) > Seq(65530) -> True
-        """
-        return ((other - self) % SEQ_MOD) > SEQ_HALF
 
-    def __ge__(self, other) -> bool:
-        """
-        Gibt True zurück, wenn diese Sequenznummer größer oder gleich der anderen ist.
+# Sequenznummern werden als einfache int-Werte (0..65535) gespeichert. Vergleiche und
+# Arithmetik mit Wrap-around laufen über die folgenden Funktionen, damit weder bei jedem
+# Vergleich eine Methode einer int-Unterklasse aufgerufen noch bei jeder Addition ein
+# neues Objekt erzeugt werden muss.
 
-        Beispiel:
-          Seq(20) >= Seq(20) -> True
-          Seq(5) >= Seq(65530) -> True
-        """
-        return self == other or self > other
+def seq_lt(a: int, b: int) -> bool:
+    """
+    Gibt True zurück, wenn Sequenznummer a kleiner ist als b.
 
-    def __add__(self, other) -> "Seq":
-        """
-        Addiert eine Ganzzahl (z.B. ein Offset) zur Sequenznummer und normalisiert das Ergebnis
-        in den Sequenzraum mit Wrap-around.
+    Dies berücksichtigt das Überlaufen des Sequenznummernraums ("Wrap-around").
+    Typisch verwendet, um zu prüfen, ob ein Segment in der Zukunft liegt.
 
-        Gibt eine neue Sequenznummer zurück.
+    Beispiel:
+      seq_lt(10, 20)    -> True
+      seq_lt(65530, 5)  -> True (da Wrap-around)
+    """
+    return ((a - b) & SEQ_MASK) > SEQ_HALF
 
-        Beispiel:
-          Seq(65534) + 5 -> Seq(3)
-        """
-        return Seq((int(self) + int(other)) % SEQ_MOD)
 
-    def __sub__(self, other) -> "Seq":
-        """
-        Berechnet die differenzierte Entfernung zwischen zwei Sequenznummern
-        unter Berücksichtigung des Wrap-around.
+def seq_le(a: int, b: int) -> bool:
+    """
+    Gibt True zurück, wenn Sequenznummer a kleiner oder gleich b ist.
 
-        Gibt einen vorzeichenbehafteten Abstand zurück:
-        - Positiv, wenn self nach other kommt
-        - Negativ, wenn self vor other liegt
+    Beispiel:
+      seq_le(10, 10)    -> True
+      seq_le(65530, 5)  -> True
+
+    Ohne Sonderfall für a == b: Der Abstand b - a liegt im Bereich 0..0x7FFF.
+    """
+    return ((b - a) & SEQ_MASK) < SEQ_HALF
+
+
+def seq_gt(a: int, b: int) -> bool:
+    """
+    Gibt True zurück, wenn Sequenznummer a größer ist als b.
+
+    Beispiel:
+      seq_gt(20, 10)    -> True
+      seq_gt(5, 65530)  -> True
+    """
+    return ((b - a) & SEQ_MASK) > SEQ_HALF
+
+
+def seq_ge(a: int, b: int) -> bool:
+    """
+    Gibt True zurück, wenn Sequenznummer a größer oder gleich b ist.
+
+    Beispiel:
+      seq_ge(20, 20)    -> True
+      seq_ge(5, 65530)  -> True
+
+    Ohne Sonderfall für a == b: Der Abstand a - b liegt im Bereich 0..0x7FFF.
+    """
+    return ((a - b) & SEQ_MASK) < SEQ_HALF
+
+
+def seq_add(a: int, n: int) -> int:
+    """
+    Addiert einen Offset zur Sequenznummer und normalisiert das Ergebnis
+    in den Sequenzraum mit Wrap-around.
+
+    Beispiel:
+      seq_add(65534, 5) -> 3
+    """
+    return (a + n) & SEQ_MASK
+
+
+def seq_sub(a: int, b: int) -> int:
+    """
+    Berechnet den vorzeichenbehafteten Abstand zwischen zwei Sequenznummern
+    unter Berücksichtigung des Wrap-around.
+
+    - Positiv, wenn a nach b kommt
+    - Negativ, wenn a vor b liegt
+
+    Beispiel:
+      seq_sub(5, 65530) -> 11
+      seq_sub(65530, 5) -> -11
+    """
+    return ((a - b + SEQ_HALF) & SEQ_MASK) - SEQ_HALF
 
-        Beispiel:
-          Seq(5) - Seq(65530) -> 11
-          Seq(65530) - Seq(5) -> -11
-        """
-        return Seq((int(self) - int(other) + SEQ_HALF) % SEQ_MOD - SEQ_HALF)
 
 class LoRaTCPSegment:
 
-    # Struct-Format: B (1 Byte Socket-ID and flags), H (2 Byte Seq), H (2 Byte Ack)
-    _STRUCT_FORMAT = ">BHH"
-    _HEADER_SIZE = struct.calcsize(_STRUCT_FORMAT)
+    # Header (SEGMENT_HEADER_LENGTH Byte): Byte 0 Socket-ID (obere 4 Bit) und Flags (untere 4 Bit),
+    # Byte 1-2 Seq, Byte 3-4 Ack, jeweils Big-Endian (siehe _encode_segment)
 
-    __slots__ = ('socket_id', 'syn_flag', 'ack_flag', 'fin_flag', 'rst_flag', 'seq', 'ack', 'payload')
+    # Socket-ID und Flags werden nach der Erzeugung nicht mehr verändert, daher wird das
+    # erste Header-Byte nur einmal berechnet (_header_byte). Das ACK-Flag wird über set_ack() gesetzt.
+    # Konstruktion und (De-)Serialisierung sind mit @micropython.native zu Maschinencode übersetzt.
+    __slots__ = ('socket_id', 'syn_flag', 'ack_flag', 'fin_flag', 'rst_flag', 'seq', 'ack', 'payload',
+                 '_header_byte')
 
-    def __init__(self, socket_id: int, seq: Seq, ack: Seq = Seq(0x0), syn_flag: bool = False, ack_flag: bool = True,
+    @micropython.native
+    def __init__(self, socket_id: int, seq: int, ack: int = 0, syn_flag: bool = False, ack_flag: bool = True,
                  fin_flag: bool = False, rst_flag: bool = False, payload: bytes = b''):
         if not (0 <= socket_id <= 15):
             raise ValueError("Socket-ID must be between 0 and 15")
         self.socket_id = socket_id
+        # Flags werden unverändert gespeichert: bool aus dem Konstruktor oder 0/1 aus from_bytes()
         self.syn_flag = syn_flag
         self.ack_flag = ack_flag
         self.fin_flag = fin_flag
         self.rst_flag = rst_flag
-        self.seq = 0 if seq is None else Seq(seq)  # type: Seq
-        self.ack = 0 if ack is None else Seq(ack)  # type: Seq
+        self._header_byte = (socket_id << 4) | syn_flag | (ack_flag << 1) | (fin_flag << 2) | (rst_flag << 3)
+        self.seq = 0 if seq is None else seq & SEQ_MASK  # type: int
+        self.ack = 0 if ack is None else ack & SEQ_MASK  # type: int
         if len(payload) > 243:
             raise ValueError("Payload must be less than 244 bytes")
         self.payload = payload
 
     @classmethod
-    def from_bytes(cls, data: bytes) -> "LoRaTCPSegment":
-        if len(data) < cls._HEADER_SIZE:
-            raise ValueError("Segment too short")
+    @micropython.native
+    def from_bytes(cls, data, _flag_table=_FLAG_TABLE,
+                   _memoryview=memoryview, _bytes=bytes) -> "LoRaTCPSegment":
+        """
+        Deserialisiert ein Segment aus bytes, bytearray oder memoryview.
 
-        # Unpack Header (1B socket_id_flags, 2B seq, 2B ack)
-        socket_id_flag_byte, seq, ack = struct.unpack(cls._STRUCT_FORMAT, data[:5])
+        Der Header wird direkt aus dem Puffer gelesen, die Payload wird genau einmal
+        als bytes kopiert (der Empfangspuffer erwartet unveränderliche Daten).
 
-        socket_id = (socket_id_flag_byte & 0xF0) >> 4
-        flags_byte = socket_id_flag_byte & 0x0F
+        Die Parameter mit Unterstrich sind nicht zur Übergabe gedacht: Als Default-Argumente
+        werden die globalen Namen einmalig gebunden und im Rumpf als lokale Variablen gelesen.
+        """
+        if len(data) < SEGMENT_HEADER_LENGTH:
+            raise ValueError("Segment too short")
 
-        # Extract flags
-        syn_flag = bool(flags_byte & 0b0001)
-        ack_flag = bool(flags_byte & 0b0010)
-        fin_flag = bool(flags_byte & 0b0100)
-        rst_flag = bool(flags_byte & 0b1000)
+        # Header direkt lesen (1B socket_id_flags, 2B seq, 2B ack, Big-Endian),
+        # ohne Hilfsfunktion und ohne Tupel für die drei Werte
+        seq = (data[1] << 8) | data[2]
+        ack = (data[3] << 8) | data[4]
 
-        # Payload
-        payload = data[5:]
+        # Payload: Slicing über memoryview kopiert nichts, bytes() kopiert genau einmal
+        payload = _bytes(_memoryview(data)[SEGMENT_HEADER_LENGTH:])
 
-        return cls(socket_id, seq=Seq(seq), ack=Seq(ack),
-                   syn_flag=syn_flag, ack_flag=ack_flag,
-                   fin_flag=fin_flag, rst_flag=rst_flag,
-                   payload=payload)
+        return cls._new_unchecked(data[0], seq, ack, payload, _flag_table)
 
-    def to_bytes(self) -> bytes:
-        # Flags zusammenbauen
-        flags = (self.syn_flag << 0) | (self.ack_flag << 1) | (self.fin_flag << 2) | (self.rst_flag << 3)
-        socket_id_flag_byte = ((self.socket_id & 0x0F) << 4) | flags
+    @classmethod
+    @micropython.native
+    def _new_unchecked(cls, header_byte: int, seq: int, ack: int, payload: bytes,
+                       _flag_table=_FLAG_TABLE) -> "LoRaTCPSegment":
+        """
+        Erzeugt ein Segment ohne die Prüfungen aus __init__, nur für from_bytes().
 
-        # Pack Header
-        header = struct.pack(self._STRUCT_FORMAT, socket_id_flag_byte, int(self.seq), int(self.ack))
+        Dekodierte Werte sind bereits gültig: Die Socket-ID ist ein 4-Bit-Nibble, seq/ack
+        sind 16 Bit breit und die Payload stammt aus einem Frame mit höchstens 249 Byte.
+        """
+        seg = object.__new__(cls)
+        seg.socket_id = header_byte >> 4
+        seg.syn_flag, seg.ack_flag, seg.fin_flag, seg.rst_flag = _flag_table[header_byte & 0x0F]
+        seg._header_byte = header_byte
+        seg.seq = seq
+        seg.ack = ack
+        seg.payload = payload
+        return seg
+
+    def set_ack(self, ack: int):
+        """
+        Setzt die ACK-Nummer und das ACK-Flag, z.B. bevor ein Segment erneut übertragen wird.
+        """
+        self.ack = ack
+        self.ack_flag = 1
+        self._header_byte |= 0b0010
 
-        return header + self.payload
+    @micropython.native
+    def to_bytes(self, _encode_segment=_encode_segment) -> bytearray:
+        # Header und Payload werden in einen einzigen Puffer passender Größe geschrieben.
+        # _encode_segment ist als Default-Argument lokal gebunden (kein globaler Lookup)
+        return _encode_segment(self._header_byte, self.seq, self.ack, self.payload)
 
     def __repr__(self):
-        flags = []
-        if self.syn_flag:
-            flags.append("SYN")
-        if self.ack_flag:
-            flags.append("ACK")
-        if self.fin_flag:
-            flags.append("FIN")
-        if self.rst_flag:
-            flags.append("RST")
-        flags_str = "|".join(flags) if flags else "NONE"
+        # Die unteren 4 Bit des Header-Bytes sind genau das Flag-Nibble
+        flags_str = _FLAGS_STR[self._header_byte & 0x0F]
 
         return (f"<LoRaTCPSegment "
                 f"socket_id=0x{self.socket_id}, "
@@ -6,10 +6,14 @@ import time
 from ucollections import deque
 from micropython import const
 
-from LoRaNetworking.LoRaTCPSegment import Seq
+from LoRaNetworking.LoRaTCPSegment import seq_lt, seq_le, seq_add
 
 # DataFrameMaxPayloadLength - (2 + 2 + 2 + 1) -> 241, Socket_ID, Flags, Seq_Number, ACK_Number
 LoRaTCP_MAX_PAYLOAD_SIZE = const(241)
+# Maximale Anzahl einzelner Blöcke im Sende-Puffer, darüber werden neue Daten an den letzten Block angehängt
+SEND_BUFFER_MAX_CHUNKS = const(32)
+# Ab so vielen gelesenen Bytes wird reassembled_data kompaktiert (sofern mind. die Hälfte gelesen ist)
+REASSEMBLED_COMPACT_THRESHOLD = const(1024)
 
 LOGLEVEL_DEBUG = const(0)
 LOGLEVEL_INFO = const(1)
@@ -17,6 +21,8 @@ LOGLEVEL_WARNING = const(2)
 LOGLEVEL_ERROR = const(3)
 
 TCP_LOG_LEVEL = const(LOGLEVEL_DEBUG)
+# Vorab ausgewertet: Nachrichten werden nur formatiert, wenn sie auch ausgegeben werden
+_DBG = TCP_LOG_LEVEL == LOGLEVEL_DEBUG
 
 
 def _log(message: str, loglevel=LOGLEVEL_DEBUG):
@@ -50,8 +56,9 @@ class TCB:
 
     __slots__ = ('remote_ip', 'remote_port', 'socket_id', 'active_open', 'time_wait_timer', 'user_timeout_timer',
                  'retransmission_timeout_timer', 'snd_wnd', 'rcv_wnd', 'state', 'retransmission_queue',
-                 'reassembled_data_lock',
-                 'receive_buffer', 'reassembled_data', 'send_buffer', 'send_buffer_lock', 'MSL_TIMEOUT_MS', 'fin_seq',
+                 'reassembled_data_lock', 'reassembled_head',
+                 'receive_buffer', 'reassembled_data', 'send_buffer', 'send_buffer_len', 'send_buffer_lock',
+                 'MSL_TIMEOUT_MS', 'fin_seq',
                  'snd_una', 'snd_nxt',
                  'rcv_nxt', 'iss', 'irs', '_close_wait_timer', 'timer_paused'
                  )
@@ -78,19 +85,23 @@ class TCB:
         # Sende-Puffer für Daten die noch auf ein ACK warten
         self.retransmission_queue = deque((), 20)  # type: Deque[LoRaTCPSegment]
         # Empfangs-Puffer für Daten die noch nicht an die Anwendung übergeben wurden
-        self.receive_buffer = {}  # type: Dict[Seq, bytes]
+        self.receive_buffer = {}  # type: Dict[int, bytes]
         # Ein zusammenhängender Stream an Daten die für die Anwendung bestimmt sind und aus dem receive_buffer kommen
-        self.reassembled_data = bytes()  # type: bytes
+        # Gelesen wird ab reassembled_head, damit read() nicht bei jedem Aufruf den Rest kopiert
+        self.reassembled_data = bytearray()  # type: bytearray
+        self.reassembled_head = 0
         self.reassembled_data_lock = _thread.allocate_lock()
-        # Ein zusammenhängender Stream an Daten, die noch nicht gesendet wurden. Müssen nach Versand als Segment in die retransmission_queue kopiert werden
-        self.send_buffer = bytes()
+        # Ein zusammenhängender Stream an Daten, die noch nicht gesendet wurden. Müssen nach Versand als Segment in die retransmission_queue kopiert werden.
+        # Die Daten werden als Blöcke gehalten, damit weder Anhängen noch Entnehmen den ganzen Puffer kopiert
+        self.send_buffer = deque((), SEND_BUFFER_MAX_CHUNKS)  # type: Deque[bytes]
+        self.send_buffer_len = 0  # Anzahl der Bytes im send_buffer
         self.send_buffer_lock = _thread.allocate_lock()
 
         self.MSL_TIMEOUT_MS = None
 
-        self.fin_seq = None  # type: Seq
+        self.fin_seq = None  # type: int
 
-        self.snd_una = None  # type: Seq
+        self.snd_una = None  # type: int
         """
         SND.UNA: kleinste noch nicht bestätigte Sequenznummer
         The sender of data keeps track of the oldest unacknowledged sequence number in the variable SND.UNA
@@ -98,14 +109,14 @@ class TCB:
         [Source: RFC 793 pp. 40]
         """
 
-        self.snd_nxt = None  # type: Seq
+        self.snd_nxt = None  # type: int
         """
         SND.NXT: nächste zu sendende Sequenznummer
         The sender of data keeps track of the next sequence number to use in the variable SND.NXT
         [Source: RFC 793 pp. 40]
         """
 
-        self.rcv_nxt = None  # type: Seq
+        self.rcv_nxt = None  # type: int
         """
         RCV.NXT: nächste erwartete Sequenznummer
         The receiver of data keeps track of the next sequence number to expect in the variable RCV.NXT
@@ -114,8 +125,8 @@ class TCB:
         Bei Empfang von Segment: Segment.Sequenznummer -> RCV.NXT
         """
 
-        self.iss = Seq(random.getrandbits(16))  # type: Seq
-        self.irs = None  # type: Seq
+        self.iss = random.getrandbits(16)  # type: int
+        self.irs = None  # type: int
         TCB.INSTANCES.append(self)
 
     def remove_acknowledged_segments_from_retransmission_queue(self):
@@ -131,10 +142,73 @@ class TCB:
 
         if len(segments_to_remove) > 0:
             del segments_to_remove
-            _log(f"Removed acknowledged segments up to {self.snd_una} for socket {self.socket_id}")
+            if _DBG:
+                _log(f"Removed acknowledged segments up to {self.snd_una} for socket {self.socket_id}")
 
-    def is_ack_acceptable(self, ack: Seq) -> bool:
-        return Seq(self.snd_una) < Seq(ack) <= Seq(self.snd_nxt)
+    def append_send_data(self, data: bytes):
+        """
+        Hängt Daten an den Sende-Puffer an, ohne den bisherigen Inhalt zu kopieren.
+        Der Aufrufer muss send_buffer_lock halten.
+        """
+        if len(data) == 0:
+            return
+        send_buffer = self.send_buffer
+        if len(send_buffer) >= SEND_BUFFER_MAX_CHUNKS:
+            # Puffer voll: mit dem letzten Block zusammenfassen statt Daten zu verwerfen
+            send_buffer.append(bytes(send_buffer.pop()) + data)
+        else:
+            send_buffer.append(bytes(data))
+        self.send_buffer_len += len(data)
+
+    def take_send_data(self, max_len: int) -> bytes:
+        """
+        Entnimmt höchstens max_len Bytes vom Anfang des Sende-Puffers. Kopiert werden nur die
+        entnommenen Bytes, ein angebrochener Block bleibt als memoryview im Puffer.
+        Der Aufrufer muss send_buffer_lock halten.
+        """
+        send_buffer = self.send_buffer
+        payload_len = min(max_len, self.send_buffer_len)
+        payload = b''
+        while len(payload) < payload_len:
+            chunk = send_buffer.popleft()
+            needed = payload_len - len(payload)
+            if len(chunk) > needed:
+                chunk = memoryview(chunk)
+                send_buffer.appendleft(chunk[needed:])
+                chunk = chunk[:needed]
+            payload += bytes(chunk)
+        self.send_buffer_len -= payload_len
+        return payload
+
+    def reassembled_data_len(self) -> int:
+        """
+        Anzahl der Bytes in reassembled_data, die noch nicht gelesen wurden.
+        """
+        return len(self.reassembled_data) - self.reassembled_head
+
+    def take_reassembled_data(self, max_len: int) -> bytes:
+        """
+        Entnimmt höchstens max_len ungelesene Bytes aus reassembled_data. Statt den Rest bei jedem
+        Aufruf zu kopieren, wird nur der Lesezeiger verschoben und gelegentlich kompaktiert.
+        Der Aufrufer muss reassembled_data_lock halten.
+        """
+        buffer = self.reassembled_data
+        head = self.reassembled_head
+        end = min(head + max_len, len(buffer))
+        data = bytes(memoryview(buffer)[head:end])
+        if end == len(buffer):
+            # Alles gelesen: ohne Kopie neu beginnen
+            self.reassembled_data = bytearray()
+            self.reassembled_head = 0
+        elif end >= REASSEMBLED_COMPACT_THRESHOLD and end * 2 >= len(buffer):
+            self.reassembled_data = buffer[end:]
+            self.reassembled_head = 0
+        else:
+            self.reassembled_head = end
+        return data
+
+    def is_ack_acceptable(self, ack: int) -> bool:
+        return seq_lt(self.snd_una, ack) and seq_le(ack, self.snd_nxt)
 
     @staticmethod
     def acknowledge_segment_in_retransmission_queue(seg_seq: int, seg_len: int, incoming_ack: int) -> bool:
@@ -146,7 +220,7 @@ class TCB:
         :param incoming_ack: Acknowledgment value in the incoming segment
         :return: True if the segment was acknowledged, False otherwise
         """
-        return (Seq(seg_seq) + Seq(seg_len)) <= incoming_ack
+        return seq_le(seq_add(seg_seq, seg_len), incoming_ack)
 
     @staticmethod
     def create_or_get_existing(address: str, port: int) -> "TCB":
@@ -179,8 +253,8 @@ class TCB:
         self.user_timeout_timer = None
         self.time_wait_timer = None
         self._close_wait_timer = None
-        self.iss = Seq(random.getrandbits(16))  # type: Seq
-        self.irs = None  # type: Seq
+        self.iss = random.getrandbits(16)  # type: int
+        self.irs = None  # type: int
         self.remote_ip = None
         self.remote_port = None
         self.socket_id = None
@@ -192,12 +266,14 @@ class TCB:
         self.rcv_wnd = LoRaTCP_MAX_PAYLOAD_SIZE  # Aktuelle größe des Empfangs-Fensters
         self.state = TCB.STATE_CLOSED
         self.retransmission_queue = deque((), 20)  # type: Deque[LoRaTCPSegment]
-        self.receive_buffer = {}  # type: Dict[Seq, bytes]
-        self.reassembled_data = bytes()  # type: bytes
-        self.send_buffer = bytes()
+        self.receive_buffer = {}  # type: Dict[int, bytes]
+        self.reassembled_data = bytearray()  # type: bytearray
+        self.reassembled_head = 0
+        self.send_buffer = deque((), SEND_BUFFER_MAX_CHUNKS)  # type: Deque[bytes]
+        self.send_buffer_len = 0
         self.MSL_TIMEOUT_MS = None
-        self.fin_seq = None  # type: Seq
-        self.snd_una = None  # type: Seq
-        self.snd_nxt = None  # type: Seq
-        self.rcv_nxt = None  # type: Seq
+        self.fin_seq = None  # type: int
+        self.snd_una = None  # type: int
+        self.snd_nxt = None  # type: int
+        self.rcv_nxt = None  # type: int
         gc.collect()
\ No newline at end of file